@@ -1,30 +1,48 @@
 import numpy as np
+from .rng import make_rng
 class HalfWavePlate:
     """
     Simulates a half-wave plate (HWP) that rotates polarization by 2*theta degrees.
     The HWP is set at an angle theta (degrees), and the incoming polarization (deg) is rotated accordingly.
     Includes a small random angle error (misalignment) and some depolarization (fidelity loss).
     """
-    def __init__(self, theta_deg, angle_error_std=0.5, depol_prob=0.01):
+    def __init__(self, theta_deg, angle_error_std=0.5, depol_prob=0.01, rng=None):
         """
         theta_deg: Intended HWP setting in degrees
         angle_error_std: std dev of angle mis-setting (degrees)
         depol_prob: probability the pulse is totally depolarized
+        rng: seed / SeedSequence / RandomStream for the plate's errors (see rng.make_rng)
         """
         self.theta_deg = theta_deg
         self.angle_error_std = angle_error_std
         self.depol_prob = depol_prob
+        self.rng = make_rng(rng)
 
     def apply(self, pulse):
         if not hasattr(pulse, "polarization"):
             raise AttributeError("Pulse does not have a polarization attribute (degrees).")
         # Simulate misalignment error:
-        effective_theta = self.theta_deg + np.random.normal(0, self.angle_error_std)
+        effective_theta = self.theta_deg + self.rng.normal(0, self.angle_error_std)
         # Apply half-wave plate action (rotates polarization by 2*theta)
         old_pol = pulse.polarization
         new_pol = (old_pol + 2*effective_theta) % 180  # 0-179 degrees
         # With depol_prob, make it random (i.e., depolarize)
-        if np.random.rand() < self.depol_prob:
-            new_pol = np.random.uniform(0, 180)
+        if self.rng.random() < self.depol_prob:
+            new_pol = self.rng.uniform(0, 180)
         pulse.polarization = new_pol
         return pulse
+
+    def apply_batch(self, polarizations, theta_deg=None):
+        """
+        Vectorised apply for a whole pulse train: polarizations is an array of angles (deg),
+        theta_deg an optional per-pulse array of plate settings (defaults to self.theta_deg).
+        Returns the new polarization array; misalignment and depolarization are drawn per pulse.
+        """
+        polarizations = np.asarray(polarizations, dtype=float)
+        theta = self.theta_deg if theta_deg is None else np.asarray(theta_deg, dtype=float)
+        n = polarizations.size
+        effective_theta = theta + self.rng.normal(0, self.angle_error_std, n)
+        new_pol = (polarizations + 2*effective_theta) % 180
+        depol = self.rng.random(n) < self.depol_prob
+        new_pol[depol] = self.rng.uniform(0, 180, np.count_nonzero(depol))
+        return new_pol
@@ -1,17 +1,28 @@
 import numpy as np
-from .pulse import Pulse    
+from functools import lru_cache
 from .snspd import SNSPD  
+from .rng import make_rng, spawn
+
+
+@lru_cache(maxsize=None)
+def _hermite_nodes(order):
+    # probabilists' Gauss-Hermite nodes, weights normalised to sum to 1
+    x, w = np.polynomial.hermite_e.hermegauss(order)
+    return x, w / w.sum()
 
 class MachZehnderInterferometer:
     def __init__(self, 
                  snspd0=None, snspd1=None,
                  visibility=0.98,      # Interferometer visibility (0..1)  <--- (Represents optical alignment and polarization overlap)
-                 phase_noise_std=0.01  # Phase noise (radians)             <--- (Represents random phase shifts in the delay line/fibers)
+                 phase_noise_std=0.01, # Phase noise (radians)             <--- (Represents random phase shifts in the delay line/fibers)
+                 rng=None              # Seed / SeedSequence for the phase noise and default detectors (see rng.make_rng)
                 ):
         self.visibility = visibility
         self.phase_noise_std = phase_noise_std
-        self.snspd0 = snspd0 if snspd0 else SNSPD()
-        self.snspd1 = snspd1 if snspd1 else SNSPD()
+        own, seed0, seed1 = spawn(rng, 3)
+        self.rng = make_rng(own)
+        self.snspd0 = snspd0 if snspd0 else SNSPD(rng=seed0)
+        self.snspd1 = snspd1 if snspd1 else SNSPD(rng=seed1)
 
     def measure(self, pulse_prev, pulse_next, current_time=0.0):
         """
@@ -22,7 +33,7 @@ class MachZehnderInterferometer:
         # ---- Practical: Phase Difference Calculation ----
         # (This is the real function of the MZI: overlap two pulses and compute their phase difference)
         phase_diff = (getattr(pulse_next, "phase", 0.0) - getattr(pulse_prev, "phase", 0.0))
-        phase_diff += np.random.normal(0, self.phase_noise_std)  # Adds random phase drift (thermal/mechanical/vibration noise in lab)
+        phase_diff += self.rng.normal(0, self.phase_noise_std)  # Adds random phase drift (thermal/mechanical/vibration noise in lab)
 
         # ---- Practical: Interference with Finite Visibility ----
         # (Imperfections reduce maximum/minimum contrast. Real hardware never has 100% visibility)
@@ -30,27 +41,16 @@ class MachZehnderInterferometer:
         prob1 = 1 - prob0                                        # Probability for detector 1
 
         # ---- Practical: Pulse Splitting at Output Beamsplitter ----
-        # (Physically, the output arms of the interferometer get a share of the pulse energy depending on phase difference)
-        pulse0 = Pulse(
-            wavelength=pulse_prev.wavelength,
-            duration=pulse_prev.duration,
-            amplitude=pulse_prev.amplitude * np.sqrt(prob0),  # Energy share
-            phase=0,
-        )
-        pulse0.mean_photon_number = prob0 * getattr(pulse_prev, "mean_photon_number", 1)
-
-        pulse1 = Pulse(
-            wavelength=pulse_prev.wavelength,
-            duration=pulse_prev.duration,
-            amplitude=pulse_prev.amplitude * np.sqrt(prob1),
-            phase=0,
-        )
-        pulse1.mean_photon_number = prob1 * getattr(pulse_prev, "mean_photon_number", 1)
+        # (Physically, the output arms of the interferometer get a share of the pulse energy depending on phase difference;
+        #  only the photon number of each share matters to the detectors, so no output Pulse objects are built)
+        mu = getattr(pulse_prev, "mean_photon_number", 1)
+        window = getattr(pulse_prev, "duration", 1e-9)
+        wavelength = getattr(pulse_prev, "wavelength", None)
 
         # ---- Practical: Detection by SNSPDs ----
         # (SNSPDs click with probability based on pulse photon number and detector efficiency, plus possible dark counts)
-        click0, info0 = self.snspd0.detect(pulse0, current_time)
-        click1, info1 = self.snspd1.detect(pulse1, current_time)
+        click0, info0 = self.snspd0.detect_photons(prob0 * mu, current_time, window, wavelength)
+        click1, info1 = self.snspd1.detect_photons(prob1 * mu, current_time, window, wavelength)
 
         # ---- Practical: Which Detector Clicked? (Key Bit Extraction) ----
         # (In real DPS-QKD, Bob records a bit only when exactly one detector clicks)
@@ -61,3 +61,38 @@ class MachZehnderInterferometer:
         else:
             # No click or both clicked (very rare in SNSPDs): discard event
             return None, {"snspd0": info0, "snspd1": info1}
+
+    def measure_batch(self, phase_diffs, times, mean_photon_numbers, detection_window=1e-9):
+        """
+        Array version of measure for a whole pulse train: phase_diffs are the nominal phase
+        differences of each interfering pulse pair, times their arrival times and
+        mean_photon_numbers the photon number of the pulse pair entering the interferometer.
+        Phase noise and visibility are applied per pair and the output shares go straight to
+        the detectors' detect_batch, so no Pulse objects are created.
+        Returns an int8 array of bits: 0 / 1 when exactly one detector clicked, -1 otherwise.
+        """
+        phase_diffs = np.asarray(phase_diffs, dtype=float)
+        phase_diffs = phase_diffs + self.rng.normal(0, self.phase_noise_std, phase_diffs.size)
+        prob0 = 0.5 * (1 + self.visibility * np.cos(phase_diffs))
+
+        click0, _, _ = self.snspd0.detect_batch(times, prob0 * mean_photon_numbers, detection_window=detection_window)
+        click1, _, _ = self.snspd1.detect_batch(times, (1 - prob0) * mean_photon_numbers, detection_window=detection_window)
+
+        bits = np.full(phase_diffs.size, -1, dtype=np.int8)
+        bits[click0 & ~click1] = 0
+        bits[click1 & ~click0] = 1
+        return bits
+
+    def outcome_probabilities(self, phase_diff, mean_photon_number, detection_window=1e-9, live=(1.0, 1.0), order=32):
+        """
+        Closed-form counterpart of measure: probabilities that only detector 0 / only detector 1
+        clicks for a pulse pair with nominal phase difference phase_diff. The Gaussian phase noise
+        is averaged with Gauss-Hermite quadrature; live scales each detector's click probability
+        (dead-time live fraction, see SNSPD.live_fraction).
+        Returns (p0, p1).
+        """
+        x, w = _hermite_nodes(order)
+        prob0 = 0.5 * (1 + self.visibility * np.cos(phase_diff + self.phase_noise_std * x))
+        c0 = live[0] * self.snspd0.click_probability(prob0 * mean_photon_number, detection_window)
+        c1 = live[1] * self.snspd1.click_probability((1 - prob0) * mean_photon_number, detection_window)
+        return float(np.dot(w, c0 * (1 - c1))), float(np.dot(w, c1 * (1 - c0)))
@@ -1,16 +1,20 @@
 import numpy as np
+from math import erf, sqrt
+from .rng import make_rng
 class PolarizingBeamSplitter:
     """
     Ideal PBS: sends horizontal (0°) to 'H' port, vertical (90°) to 'V' port.
     In practice, also include finite extinction ratio and angle jitter.
     """
-    def __init__(self, extinction_ratio_db=30, angle_jitter_std=1.0):
+    def __init__(self, extinction_ratio_db=30, angle_jitter_std=1.0, rng=None):
         """
         extinction_ratio_db: how well PBS separates polarizations (higher = better)
         angle_jitter_std: standard deviation in deg, simulates alignment error
+        rng: seed / SeedSequence / RandomStream for jitter and leakage (see rng.make_rng)
         """
         self.extinction_ratio_db = extinction_ratio_db
         self.angle_jitter_std = angle_jitter_std
+        self.rng = make_rng(rng)
 
     def angle_distance(self, a, b):
         """
@@ -30,7 +34,7 @@ class PolarizingBeamSplitter:
         if not hasattr(pulse, "polarization"):
             raise AttributeError("Pulse has no polarization attribute (degrees).")
 
-        pol = (pulse.polarization + np.random.normal(0, self.angle_jitter_std)) % 180
+        pol = (pulse.polarization + self.rng.normal(0, self.angle_jitter_std)) % 180
 
         # Determine nearest axis
         if self.angle_distance(pol, 0) < 22.5:
@@ -42,11 +46,55 @@ class PolarizingBeamSplitter:
         else:
             # Diagonal: use extinction ratio to split
             extinction_prob = 10**(-self.extinction_ratio_db / 10)
-            if np.random.rand() < extinction_prob:
+            if self.rng.random() < extinction_prob:
                 # Leakage to wrong port
-                main_port = np.random.choice(['H', 'V'])
+                main_port = self.rng.choice(['H', 'V'])
             else:
                 # Blocked: no output
                 return None
 
         return main_port  # Route to port 'H' or 'V'
+
+    def split_batch(self, polarizations):
+        """
+        Vectorised split for an array of polarizations (deg).
+        Returns an int8 array of ports: 0 = 'H', 1 = 'V', -1 = blocked (no output).
+        """
+        polarizations = np.asarray(polarizations, dtype=float)
+        n = polarizations.size
+        pol = (polarizations + self.rng.normal(0, self.angle_jitter_std, n)) % 180
+        d = np.minimum(pol, 180 - pol)  # distance to H (0°), in [0, 90]
+
+        ports = np.full(n, -1, dtype=np.int8)
+        ports[d < 22.5] = 0
+        ports[90 - d < 22.5] = 1
+
+        # Diagonal: leakage to a random port with the extinction probability, otherwise blocked
+        diagonal = np.flatnonzero(ports == -1)
+        extinction_prob = 10**(-self.extinction_ratio_db / 10)
+        leaked = diagonal[self.rng.random(diagonal.size) < extinction_prob]
+        ports[leaked] = self.rng.integers(0, 2, leaked.size)
+        return ports
+
+    def port_probabilities(self, polarization, pol_err_std=0.0, depol_prob=0.0):
+        """
+        Closed-form counterpart of split_batch: probabilities that a pulse with nominal polarization
+        (deg), Gaussian angle error pol_err_std (deg, combined with the PBS jitter) and probability
+        depol_prob of being fully depolarized leaves the 'H' / 'V' port.
+        Returns (p_H, p_V); the rest is blocked.
+        """
+        sigma = max(np.hypot(pol_err_std, self.angle_jitter_std), 1e-12)
+
+        def mass(lo, hi):
+            # Gaussian mass of [lo, hi] modulo 180
+            scale = sigma * sqrt(2)
+            return sum(0.5 * (erf((hi + k - polarization) / scale) - erf((lo + k - polarization) / scale))
+                       for k in (-180.0, 0.0, 180.0))
+
+        extinction_prob = 10**(-self.extinction_ratio_db / 10)
+        p_h, p_v = mass(-22.5, 22.5), mass(67.5, 112.5)
+        leak = extinction_prob * (1 - p_h - p_v) / 2
+        # uniform polarization: a quarter of the circle routes to each port, half is diagonal
+        uniform = 0.25 + extinction_prob * 0.25
+        return ((1 - depol_prob) * (p_h + leak) + depol_prob * uniform,
+                (1 - depol_prob) * (p_v + leak) + depol_prob * uniform)
@@ -2,37 +2,94 @@
 
 import numpy as np
 from .state import QuantumState
+from .rng import make_rng
 class OpticalChannel:
-    def __init__(self, name, length_meters, attenuation_db_per_m, light_speed=2e8):
+    def __init__(self, name, length_meters, attenuation_db_per_m, light_speed=2e8, rng=None):
         self.name = name #name of channel
         self.length = length_meters #total length
         self.attenuation = attenuation_db_per_m #alpha, basically
         self.light_speed = light_speed
+        self._cache_key = None  # (attenuation, length, light_speed) the cached values below were computed for
+        self._transmittance = None
+        self._delay = None
+        self.rng = make_rng(rng)  # loss and noise draws (see rng.make_rng)
 
+    def _refresh(self):
+        # transmittance and delay only change with the channel parameters, so they are computed once per setting
+        key = (self.attenuation, self.length, self.light_speed)
+        if key != self._cache_key:
+            self._transmittance = 10 ** (-self.attenuation * self.length / 10)  #refer above comment
+            self._delay = self.length / self.light_speed
+            self._cache_key = key
 
-
+    def transmittance(self):
+        self._refresh()
+        return self._transmittance
 
     def compute_loss(self):
-        return 1 - 10 ** (-self.attenuation * self.length / 10)  #refer above comment
+        return 1 - self.transmittance()
 
     def compute_delay(self):
-        return self.length / self.light_speed
+        self._refresh()
+        return self._delay
+
+    def surviving_indices(self, num_pulses):
+        """
+        Indices (0..num_pulses-1) of the pulses that survive the channel loss, drawn for the whole train at once.
+        For lossy links the gaps between survivors are sampled from a geometric distribution, so the cost
+        scales with the number of pulses that arrive rather than the number sent.
+        """
+        p = self.transmittance()
+        if p >= 1:
+            return np.arange(num_pulses)
+        if p <= 0 or num_pulses == 0:
+            return np.empty(0, dtype=np.int64)
+        if p > 0.5:
+            # most pulses arrive anyway: a Bernoulli mask is cheaper
+            return np.flatnonzero(self.rng.random(num_pulses) < p)
+
+        # geometric skip sampling: survivor positions are cumulative sums of Geometric(p) gaps.
+        # Gaps are clipped to the rest of the train: at very high loss (p ~ 1e-20) geometric draws
+        # saturate at the int64 maximum, and their sum would wrap around to negative indices.
+        expected = num_pulses * p
+        chunks = []
+        last = -1
+        while last < num_pulses:
+            gaps = self.rng.geometric(p, int(expected + 5 * np.sqrt(expected)) + 16)
+            idx = last + np.cumsum(np.minimum(gaps, num_pulses - last))
+            chunks.append(idx)
+            last = idx[-1]
+            expected = (num_pulses - last) * p
+        idx = np.concatenate(chunks)
+        return idx[idx < num_pulses]
 
 '''Inherits from optical channel. But it also has the feature of depolarization of the pulse as an added extra'''
 class QuantumChannel(OpticalChannel):
-    def __init__(self, name, length_meters, attenuation_db_per_m, depol_prob=0.0, light_speed=2e8, pol_err_std=None):
-        super().__init__(name, length_meters, attenuation_db_per_m, light_speed) 
+    def __init__(self, name, length_meters, attenuation_db_per_m, depol_prob=0.0, light_speed=2e8, pol_err_std=None, rng=None):
+        super().__init__(name, length_meters, attenuation_db_per_m, light_speed, rng=rng)
         self.depol_prob = depol_prob
         self.pol_err_std=pol_err_std
 
     def transmit(self, pulse):
         loss_prob = self.compute_loss()
-        if np.random.random() < loss_prob:
+        if self.rng.random() < loss_prob:
             return None  # Pulse lost
-        if pulse.quantum_state and np.random.random() < self.depol_prob:
-            pulse.quantum_state.depolarize()
+        self.apply_noise(pulse)
         delay = self.compute_delay()
         return (pulse, delay)
+
+    def apply_noise(self, pulse):
+        """Channel noise on a pulse that survived the loss: depolarizes its quantum state with depol_prob."""
+        if pulse.quantum_state and self.rng.random() < self.depol_prob:
+            pulse.quantum_state.depolarize()
+
+    def transmit_train(self, train):
+        """
+        Bulk version of transmit for a PulseTrain, survivors are picked with surviving_indices.
+        Returns (surviving train, delay). Train pulses carry no quantum_state, so, like transmit
+        for such pulses, no depolarization is applied.
+        """
+        return train.select(self.surviving_indices(len(train))), self.compute_delay()
     
 '''Also inherits from optical channel. Has no loss faxtor, just delay.''' 
 class ClassicalChannel(OpticalChannel):
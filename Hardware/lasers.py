@@ -1,4 +1,4 @@
-from .pulse import Pulse
+from .pulse import Pulse, PulseTrain
 from .state import QuantumState
 import numpy as np
 
@@ -7,13 +7,14 @@ class Laser:
         self.wavelength = wavelength
         self.amplitude = amplitude
 
-    def emit_pulse(self, duration: float, phase=0.0, quantum_state=None):
+    def emit_pulse(self, duration: float, phase=0.0, quantum_state=None, mean_photon_number=None):
         return Pulse(
             wavelength=self.wavelength,
             duration=duration,
             amplitude=self.amplitude,
             phase=phase,
-            quantum_state=quantum_state
+            quantum_state=quantum_state,
+            mean_photon_number=mean_photon_number
         )
 
 
@@ -21,3 +22,15 @@ class Laser:
 
 
     
+
+    def emit_train(self, num_pulses: int, duration: float, interval: float, phases=None,
+                   mean_photon_number=None, start_time=0.0, first_id=0, slots=None):
+        """
+        Emits num_pulses pulses spaced by interval (s) in one go, as a PulseTrain.
+        slots optionally restricts the train to those time slots (0..num_pulses-1), e.g. the ones
+        QuantumChannel.surviving_indices lets through, so lost pulses are never materialised.
+        """
+        ids = first_id + (np.arange(num_pulses) if slots is None else np.asarray(slots, dtype=np.int64))
+        mu = np.full(ids.size, 0.0 if mean_photon_number is None else mean_photon_number)
+        return PulseTrain(ids, start_time + (ids - first_id) * interval, phases=phases,
+                          mean_photon_numbers=mu, wavelength=self.wavelength, duration=duration)
@@ -6,16 +6,150 @@ import numpy as np
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from Hardware.state import QuantumState
 from Hardware.gates import H
+from Hardware.rng import make_rng
+from utils.perf import NULL_PERF
 import numpy as np
+import json
+from collections import deque
+
+# ---- Send/receive log policies ----
+# A log is anything with append((time, port_id, data)); app.py and the protocols only read log[-1] and len(log).
+#   "full":     every entry, data objects included (default, keeps every pulse alive for the whole run)
+#   "last":     ring buffer of the last `size` entries
+#   "counters": number of entries plus time/port of the last one
+#   "off":      nothing
+#   "disk":     time, port and pulse_id of every entry spilled to column files at `path`
+
+class NullLog:
+    """Log policy 'off': every entry is dropped."""
+    def append(self, entry):
+        pass
+
+    def __len__(self):
+        return 0
+
+    def __iter__(self):
+        return iter(())
+
+
+class CounterLog:
+    """Log policy 'counters': keeps the entry count and the last entry (without its data)."""
+    def __init__(self):
+        self.count = 0
+        self.last = None
+
+    def append(self, entry):
+        self.count += 1
+        self.last = (entry[0], entry[1], None)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if self.last is not None and index in (-1, self.count - 1):
+            return self.last
+        raise IndexError("counters-only log keeps just the last entry")
+
+    def __iter__(self):
+        raise TypeError("counters-only log cannot be iterated")
+
+
+class SpillLog:
+    """
+    Log policy 'disk': entries are buffered and appended in chunks to three column files,
+    <path>.time (float64), <path>.port (uint16 code) and <path>.pulse_id (int64, -1 if the data has none),
+    with the port codes in <path>.ports.json. Data objects are not kept. read() loads the columns back.
+    """
+    def __init__(self, path, chunk_size=65536):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.ports = {}  # port_id: code
+        self.count = 0
+        self.last = None
+        self._times = np.empty(chunk_size, dtype=np.float64)
+        self._ports = np.empty(chunk_size, dtype=np.uint16)
+        self._ids = np.empty(chunk_size, dtype=np.int64)
+        self._n = 0
+        for column in ("time", "port", "pulse_id"):
+            open(f"{path}.{column}", "wb").close()
+
+    def append(self, entry):
+        t, port_id, data = entry
+        code = self.ports.setdefault(port_id, len(self.ports))
+        self._times[self._n] = t
+        self._ports[self._n] = code
+        self._ids[self._n] = getattr(data, "pulse_id", -1)
+        self._n += 1
+        self.count += 1
+        self.last = (t, port_id, None)
+        if self._n == self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        for column, buf in (("time", self._times), ("port", self._ports), ("pulse_id", self._ids)):
+            with open(f"{self.path}.{column}", "ab") as f:
+                buf[:self._n].tofile(f)
+        with open(f"{self.path}.ports.json", "w") as f:
+            json.dump(self.ports, f)
+        self._n = 0
+
+    def read(self):
+        """Returns {"time": array, "port": array of port codes, "pulse_id": array, "ports": {port_id: code}}."""
+        self.flush()
+        return {
+            "time": np.fromfile(f"{self.path}.time", dtype=np.float64),
+            "port": np.fromfile(f"{self.path}.port", dtype=np.uint16),
+            "pulse_id": np.fromfile(f"{self.path}.pulse_id", dtype=np.int64),
+            "ports": dict(self.ports),
+        }
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if self.last is not None and index in (-1, self.count - 1):
+            return self.last
+        raise IndexError("disk log keeps only the last entry in memory, use read()")
+
+    def __iter__(self):
+        raise TypeError("disk log cannot be iterated, use read()")
+
+
+def make_log(policy="full", size=1, path=None):
+    if policy == "full":
+        return []
+    if policy == "last":
+        return deque(maxlen=size)
+    if policy == "counters":
+        return CounterLog()
+    if policy == "off":
+        return NullLog()
+    if policy == "disk":
+        if path is None:
+            raise ValueError("log policy 'disk' needs a path")
+        return SpillLog(path)
+    raise ValueError(f"Unknown log policy: {policy}")
+
+
 class Node:
-    def __init__(self, node_id, env):
+    def __init__(self, node_id, env, rng=None):
         self.node_id=node_id
+        self.rng = make_rng(rng)  # the node's own random stream (see Hardware.rng)
+        self.perf = NULL_PERF     # stage timer and counters, a PerfRecorder when the run has perf on (see utils.perf)
         self.ports={} #port_id: port_name
         self.components={} #component_name: component_instance (basically all components should be classes)
         self.connections={} #sender_port_id: (target_node_id, target_port_id,  channel_object)
         self.env=env
         self.sent_log = []   # sending time of pulses, (send_time, sender_port_id, data)
         self.recv_log = []   # receiving time of pulses
+        self.last_sent_time = None  # set by batch engines, which write no per-pulse log
+        self.last_recv_time = None
+        self.metrics = {}  # protocol-specific results beyond QBER and key rate, e.g. E91's "chsh_s"
+
+    def set_log_policy(self, policy="full", size=1, path=None):
+        """Replaces sent_log/recv_log with logs of the given policy (see make_log); 'disk' writes to <path>.sent.* and <path>.recv.*"""
+        self.sent_log = make_log(policy, size=size, path=f"{path}.sent" if path else None)
+        self.recv_log = make_log(policy, size=size, path=f"{path}.recv" if path else None)
 
     def assign_port(self, port_id, port_name):
         self.ports[port_id]=port_name
@@ -47,6 +181,40 @@ class Node:
 
         self.env.process(delayed_delivery())
 
+    def send_train(self, sender_port_id, num_pulses, interval, make_pulse):
+        """
+        SimPy process sending num_pulses pulses, one every interval seconds, without one event per emitted pulse:
+        the slots that survive the channel are pre-sampled (channel.surviving_indices) and simulated time jumps
+        straight from one arrival to the next, so the event count scales with arrivals. make_pulse(i) builds
+        pulse i and is only called for survivors. Lost pulses are not logged, except the train's last slot so
+        sent_log[-1] still holds the last send time.
+        Use as env.process(node.send_train(...)). app.py does not use it (DPS links are served by the NumPy
+        engine run_dps_batch); it backs the per-pulse SimPy engine, run_dps(skip_lost_pulses=True).
+        """
+        if sender_port_id not in self.connections:
+            raise Exception(f"Port: {sender_port_id} not connected")
+        receiver_node_id, receiver_port_id, channel = self.connections[sender_port_id]
+        start = self.env.now
+        delay = channel.compute_delay()
+        apply_noise = getattr(channel, "apply_noise", None)
+
+        survivors = channel.surviving_indices(num_pulses)
+        for i in survivors:
+            send_time = start + i * interval
+            pulse = make_pulse(i)
+            if apply_noise:
+                with self.perf.stage("channel"):
+                    apply_noise(pulse)
+            with self.perf.stage("send"):  # logging and scheduling, as in send
+                self.sent_log.append((send_time, sender_port_id, pulse))
+                # every pulse has the same delay, so arrivals come in emission order
+                arrival = self.env.timeout(max(0.0, send_time + delay - self.env.now))
+            yield arrival
+            receiver_node_id.receive(pulse, receiver_port_id)
+
+        if num_pulses and (survivors.size == 0 or survivors[-1] != num_pulses - 1):
+            self.sent_log.append((start + (num_pulses - 1) * interval, sender_port_id, None))
+
 
         
     def receive(self, data, receiver_port_id):
@@ -61,10 +229,11 @@ class Node:
             print(f"  - Quantum State: {data.quantum_state}")
         else:
             print(f"[{self.node_id}] Received classical data on port '{receiver_port_id}': {data}")'''
-    def receive_entangled_qubit(self, global_state, qubit_index, pair_id):
+    def receive_entangled_qubit(self, global_state, qubit_index, pair_id, manager=None):
         self.components[pair_id] = global_state # Store shared global state
         self.qubit_index = qubit_index
         self.pair_id = pair_id
+        self.entanglement_manager = manager  # told when the qubit is measured, so the pair can be released
     
     def measure_entangled_qubit(self, basis='Z'):
         qstate = self.components[self.pair_id]
@@ -88,7 +257,10 @@ class Node:
         else:
             projectors = [np.kron(I, P0), np.kron(I, P1)]
 
-        outcome = qstate.measure(projectors=projectors, shots=1)
+        outcome = qstate.measure(projectors=projectors, shots=1, rng=self.rng)
+        manager = getattr(self, "entanglement_manager", None)
+        if manager is not None:
+            manager.consume(self, self.pair_id)
         return outcome
 
 
@@ -1,47 +1,93 @@
 import numpy as np
-from scipy.constants import h, c  # Planck's constant and speed of light
+
+h = 6.62607015e-34  # Planck's constant (J s), exact SI value
+c = 299792458.0     # speed of light in vacuum (m/s), exact SI value
+
+# Energetics depend only on (wavelength, duration, amplitude, shape), so they are computed once per key
+# and shared by every pulse with the same settings. shape=None stands for the default Gaussian.
+_energy_cache = {}  # (wavelength, duration, amplitude, shape): (energy, mean_photon_number)
+_shape_cache = {}   # (duration, shape): (time_axis, normalized_shape, cdf)
+
+
+def _shape_profile(duration, shape=None):
+    """Time axis, normalized shape and photon-arrival CDF of a pulse shape (cached)."""
+    key = (duration, shape)
+    profile = _shape_cache.get(key)
+    if profile is None:
+        time_axis = np.linspace(0, duration, 1000)
+        shape_vals = shape(time_axis) if shape else _gaussian(time_axis, duration)
+        normalized_shape = shape_vals / np.trapz(shape_vals, time_axis)
+        cdf = np.cumsum(normalized_shape)
+        cdf /= cdf[-1]
+        profile = _shape_cache[key] = (time_axis, normalized_shape, cdf)
+    return profile
+
+
+def _gaussian(t, duration):
+    """Gaussian temporal profile centered in the pulse duration."""
+    t0 = duration / 2
+    sigma = duration / 6
+    return np.exp(-0.5 * ((t - t0) / sigma) ** 2)
+
 
 class Pulse:
     def __init__(self, wavelength: float, duration: float, amplitude: float,
-                 phase= 0.0, shape: callable = None, quantum_state=None,polarization=None):
+                 phase= 0.0, shape: callable = None, quantum_state=None,polarization=None,
+                 mean_photon_number=None):
         
         self.wavelength = wavelength
         self.duration = duration
         self.amplitude = amplitude
         self.phase = phase
+        self._shape = shape
         self.shape = shape if shape else self.default_shape
 
-        self.energy = self.calculate_energy()
-        self.mean_photon_number = self.energy / self.photon_energy()
+        self._energy = None
+        if mean_photon_number is None:
+            # O(1) after the first pulse with these settings
+            self._energy, mean_photon_number = self._energetics()
+        # else lazy: the photon number is given, energy is only computed if someone asks for it
+        self.mean_photon_number = mean_photon_number
         self.quantum_state = quantum_state
         self.timestamp=None
         # Polarization (in degrees, for PBS etc.), e.g. 0=H, 90=V, 45=D, 135=A
         self.polarization = polarization
 
+    @property
+    def energy(self) -> float:
+        if self._energy is None:
+            self._energy = self._energetics()[0]
+        return self._energy
+
+    def _energetics(self):
+        key = (self.wavelength, self.duration, self.amplitude, self._shape)
+        cached = _energy_cache.get(key)
+        if cached is None:
+            energy = self.calculate_energy()
+            cached = _energy_cache[key] = (energy, energy / self.photon_energy())
+        return cached
+
     def photon_energy(self) -> float:
         """Returns energy of a single photon at the pulse's wavelength."""
         return h * c / self.wavelength #E=hc/λ
 
     def calculate_energy(self) -> float:
         """Calculates total pulse energy using amplitude and shape."""
-        time_axis = np.linspace(0, self.duration, 1000)
-        shape_vals = self.shape(time_axis)
-        normalized_shape = shape_vals / np.trapz(shape_vals, time_axis)
+        time_axis, normalized_shape, _ = _shape_profile(self.duration, self._shape)
         intensity = (self.amplitude ** 2) * normalized_shape
         return np.trapz(intensity, time_axis)
 
     def default_shape(self, t): #is a function that can be called within the argument of this class
         """Gaussian temporal profile centered in the pulse duration."""
-        t0 = self.duration / 2
-        sigma = self.duration / 6
-        return np.exp(-0.5 * ((t - t0) / sigma) ** 2)
+        return _gaussian(t, self.duration)
 
-    def sample_photon_arrivals(self):
-        """Simulate actual photon arrivals from a weak coherent state."""
+    def sample_photon_arrivals(self, rng=None):
+        """Simulate actual photon arrivals from a weak coherent state; rng defaults to the global np.random."""
+        rng = np.random if rng is None else rng
         if self.mean_photon_number <= 0:
             return []
 
-        n_photons = np.random.poisson(self.mean_photon_number)
+        n_photons = rng.poisson(self.mean_photon_number)
         #print(n_photons)
 
         if n_photons == 0:
@@ -51,11 +97,53 @@ class Pulse:
         return [self] * n_photons
 
         # Get CDF of shape
-        time_axis = np.linspace(0, self.duration, 1000)
-        shape_vals = self.shape(time_axis)
-        norm_shape = shape_vals / np.trapz(shape_vals, time_axis)
-        cdf = np.cumsum(norm_shape)
-        cdf /= cdf[-1]
+        time_axis, _, cdf = _shape_profile(self.duration, self._shape)
 
-        arrival_times = np.interp(np.random.rand(n_photons), cdf, time_axis)
+        arrival_times = np.interp(rng.random(n_photons), cdf, time_axis)
         return list(arrival_times)
+
+
+class PulseTrain:
+    """
+    Struct-of-arrays representation of a whole pulse train: one contiguous NumPy column per
+    attribute instead of one Pulse object per time slot (~30 bytes per pulse instead of ~1 KB).
+    Wavelength and duration are shared by every pulse in the train.
+    Polarization is NaN for pulses without one. Pulses in a train carry no quantum_state.
+    """
+    FLAG_DECOY = 1  # free for protocols to mark pulses, e.g. COW decoys
+
+    def __init__(self, ids, emit_times, phases=None, polarizations=None, mean_photon_numbers=None,
+                 flags=None, wavelength=1550e-9, duration=70e-12):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        n = self.ids.size
+        self.emit_times = np.asarray(emit_times, dtype=np.float64)
+        self.phases = np.zeros(n) if phases is None else np.asarray(phases, dtype=np.float64)
+        self.polarizations = np.full(n, np.nan, dtype=np.float32) if polarizations is None else np.asarray(polarizations, dtype=np.float32)
+        self.mean_photon_numbers = np.zeros(n, dtype=np.float32) if mean_photon_numbers is None else np.asarray(mean_photon_numbers, dtype=np.float32)
+        self.flags = np.zeros(n, dtype=np.uint8) if flags is None else np.asarray(flags, dtype=np.uint8)
+        self.wavelength = wavelength
+        self.duration = duration
+
+    def __len__(self):
+        return self.ids.size
+
+    def select(self, index):
+        """New train with the pulses picked by a boolean mask or index array (columns are copied)."""
+        return PulseTrain(self.ids[index], self.emit_times[index], self.phases[index],
+                          self.polarizations[index], self.mean_photon_numbers[index], self.flags[index],
+                          wavelength=self.wavelength, duration=self.duration)
+
+    def pulse(self, i):
+        """Materialises pulse i as a Pulse object, for code that still works pulse by pulse."""
+        pol = self.polarizations[i]
+        pulse = Pulse(wavelength=self.wavelength, duration=self.duration, amplitude=1.0,
+                      phase=self.phases[i], polarization=None if np.isnan(pol) else float(pol),
+                      mean_photon_number=float(self.mean_photon_numbers[i]))
+        pulse.pulse_id = int(self.ids[i])
+        pulse.timestamp = self.emit_times[i]
+        return pulse
+
+    @property
+    def nbytes(self):
+        return sum(col.nbytes for col in (self.ids, self.emit_times, self.phases,
+                                          self.polarizations, self.mean_photon_numbers, self.flags))
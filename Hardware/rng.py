@@ -0,0 +1,88 @@
+'''Random number streams for simulations: every link owns a SeedSequence tree, every component a stream spawned from it.'''
+import numpy as np
+
+BLOCK_SIZE = 4096  # scalar draws pre-drawn per refill
+
+
+class RandomStream:
+    """
+    numpy Generator with buffered scalar draws. Per-event code (one pulse per call) asks for one
+    number at a time; random() and normal() serve those from blocks of BLOCK_SIZE values drawn in a
+    single vectorized call. Calls with size= go straight to the generator, so array code is unchanged.
+    Method names follow numpy.random.Generator.
+    """
+    def __init__(self, generator, block_size=BLOCK_SIZE):
+        self.generator = generator
+        self.block_size = block_size
+        self._uniform = iter(())
+        self._normal = iter(())
+
+    def random(self, size=None):
+        if size is not None:
+            return self.generator.random(size)
+        try:
+            return next(self._uniform)
+        except StopIteration:
+            self._uniform = iter(self.generator.random(self.block_size).tolist())
+            return next(self._uniform)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        if size is not None:
+            return self.generator.normal(loc, scale, size)
+        try:
+            z = next(self._normal)
+        except StopIteration:
+            self._normal = iter(self.generator.standard_normal(self.block_size).tolist())
+            z = next(self._normal)
+        return loc + scale * z
+
+    def uniform(self, low=0.0, high=1.0, size=None):
+        if size is not None:
+            return self.generator.uniform(low, high, size)
+        return low + (high - low) * self.random()
+
+    def integers(self, low, high=None, size=None):
+        if size is not None:
+            return self.generator.integers(low, high, size)
+        if high is None:
+            low, high = 0, low
+        return low + int(self.random() * (high - low))
+
+    def choice(self, a, size=None, p=None):
+        if size is None and p is None:
+            if isinstance(a, (int, np.integer)):
+                return self.integers(a)
+            return a[self.integers(len(a))]
+        return self.generator.choice(a, size=size, p=p)
+
+    def poisson(self, lam=1.0, size=None):
+        return self.generator.poisson(lam, size)
+
+    def geometric(self, p, size=None):
+        return self.generator.geometric(p, size)
+
+
+def seed_sequence(seed=None):
+    """
+    SeedSequence for seed: an int, a SeedSequence (returned as is) or None. None takes entropy
+    from the legacy global np.random state, so code that calls np.random.seed() stays reproducible.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if seed is None:
+        seed = np.random.randint(0, 2**63 - 1, dtype=np.int64)
+    return np.random.SeedSequence(int(seed))
+
+
+def spawn(seed, n):
+    """n independent child SeedSequences of seed (see seed_sequence)."""
+    return seed_sequence(seed).spawn(n)
+
+
+def make_rng(seed=None):
+    """RandomStream for a component or node; seed may also be an existing RandomStream, returned as is."""
+    if isinstance(seed, RandomStream):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return RandomStream(seed)
+    return RandomStream(np.random.default_rng(seed_sequence(seed)))
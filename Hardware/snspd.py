@@ -1,4 +1,6 @@
+import math
 import numpy as np
+from .rng import make_rng
 
 class SNSPD:
     """
@@ -9,7 +11,8 @@ class SNSPD:
                  dark_count_rate=0.1,      # Dark counts per second (Hz)
                  dead_time=20e-9,          # Dead time after click (seconds, e.g. 20 ns)
                  timing_jitter=20e-12,     # Timing jitter (seconds, e.g. 20 ps)
-                 efficiency_spectrum=None  # Optional: function for wavelength-dependent efficiency
+                 efficiency_spectrum=None, # Optional: function for wavelength-dependent efficiency
+                 rng=None                  # Seed / SeedSequence / RandomStream (see rng.make_rng)
                  ):
         self.efficiency = efficiency
         self.dark_count_rate = dark_count_rate
@@ -17,10 +20,10 @@ class SNSPD:
         self.timing_jitter = timing_jitter
         self.efficiency_spectrum = efficiency_spectrum
         self.last_detection_time = -np.inf
+        self.rng = make_rng(rng)
 
-    def detect(self, pulse, current_time=0.0, detection_window=None):
-        
-        info = {
+    def _info(self):
+        return {
             "photon_present": False,
             "detected": False,
             "dark_count": False,
@@ -30,6 +33,10 @@ class SNSPD:
             "input_state": None,
             "pulse_properties": None,
         }
+
+    def detect(self, pulse, current_time=0.0, detection_window=None):
+        
+        info = self._info()
         # Dead time check
         if current_time - self.last_detection_time < self.dead_time:
             info["dead_time_active"] = True
@@ -39,6 +46,7 @@ class SNSPD:
         if self.efficiency_spectrum and pulse is not None:
             eff = self.efficiency_spectrum(getattr(pulse, "wavelength", None))
 
+        mu = None
         if pulse is not None:
             
 
@@ -49,25 +57,43 @@ class SNSPD:
                 "arrival_time": getattr(pulse, "arrival_time", None),
                 "mean_photon_number": getattr(pulse, "mean_photon_number", None),
             }
-            # Correct: Sample Poisson number of photons
-            n_photons = np.random.poisson(getattr(pulse, "mean_photon_number", 0))
-            detected = False
-            for _ in range(n_photons):
-                if np.random.rand() < eff:
-                    detected = True
-                    break
+            mu = getattr(pulse, "mean_photon_number", 0) or 0
+
+        if detection_window is None:
+            detection_window = getattr(pulse, "duration", 1e-9) if pulse else 1e-9
+        return self._sample_click(mu, eff, current_time, detection_window, info)
+
+    def detect_photons(self, mean_photon_number, current_time=0.0, detection_window=1e-9, wavelength=None):
+        """
+        detect for light given only by its mean photon number, e.g. an interferometer output share,
+        so callers need not build a Pulse. Same draws and return value (click, info) as detect.
+        """
+        info = self._info()
+        if current_time - self.last_detection_time < self.dead_time:
+            info["dead_time_active"] = True
+            return False, info
+
+        eff = self.efficiency
+        if self.efficiency_spectrum and wavelength is not None:
+            eff = self.efficiency_spectrum(wavelength)
+        info["photon_present"] = True
+        info["pulse_properties"] = {"wavelength": wavelength, "arrival_time": None, "mean_photon_number": mean_photon_number}
+        return self._sample_click(mean_photon_number or 0, eff, current_time, detection_window, info)
+
+    def _sample_click(self, mu, eff, current_time, detection_window, info):
+        # Poisson photons, each detected with eff: at least one is detected with 1 - exp(-eff * mu)
+        if mu is not None:
+            detected = self.rng.random() < 1 - math.exp(-eff * mu)
             if detected:
-                det_time = current_time + np.random.normal(0, self.timing_jitter)
+                det_time = current_time + self.rng.normal(0, self.timing_jitter)
                 info["detected"] = True
                 info["detection_time"] = det_time
                 self.last_detection_time = det_time
                 return True, info
 
-        if detection_window is None:
-            detection_window = getattr(pulse, "duration", 1e-9) if pulse else 1e-9
         p_dark = self.dark_count_rate * detection_window
-        if np.random.rand() < p_dark:
-            det_time = current_time + np.random.normal(0, self.timing_jitter)
+        if self.rng.random() < p_dark:
+            det_time = current_time + self.rng.normal(0, self.timing_jitter)
             info["dark_count"] = True
             info["detected"] = True
             info["detection_time"] = det_time
@@ -76,3 +102,83 @@ class SNSPD:
 
         return False, info
 
+    def detect_batch(self, times, mean_photon_numbers, detection_window=1e-9, wavelength=None):
+        """
+        Array version of detect for a block of pulses arriving at times (seconds, one per pulse).
+        A photon click happens with probability 1 - exp(-eta * mu), the closed form of sampling
+        Poisson photons and an efficiency draw per photon. Dark counts are a Poisson process over
+        the detection windows of the whole block, so only the dark counts that occur are drawn.
+        Dead time is then enforced with a single sorted sweep (gate_dead_time).
+        Returns (clicked, detection_times, dark): a bool mask per pulse, the jittered click times
+        (NaN where no click) and a bool mask of clicks caused by a dark count alone.
+        """
+        times = np.asarray(times, dtype=float)
+        n = times.size
+        eff = self.efficiency
+        if self.efficiency_spectrum and wavelength is not None:
+            eff = self.efficiency_spectrum(wavelength)
+
+        mu = np.broadcast_to(np.asarray(mean_photon_numbers, dtype=float), (n,))
+        photon = self.rng.random(n) < 1 - np.exp(-eff * mu)
+        dark = np.zeros(n, dtype=bool)
+        n_dark = self.rng.poisson(self.dark_count_rate * detection_window * n) if n else 0
+        dark[self.rng.integers(0, n, n_dark)] = True
+        dark &= ~photon
+
+        candidates = np.flatnonzero(photon | dark)
+        det_times = times[candidates] + self.rng.normal(0, self.timing_jitter, candidates.size)
+        registered = self.gate_dead_time(det_times)
+
+        clicked = np.zeros(n, dtype=bool)
+        clicked[candidates[registered]] = True
+        detection_times = np.full(n, np.nan)
+        detection_times[candidates[registered]] = det_times[registered]
+        return clicked, detection_times, dark & clicked
+
+    def gate_dead_time(self, times):
+        """
+        Vectorised dead-time check for a block of candidate click times (seconds).
+        Returns a boolean mask of the clicks that actually register: a click is dropped
+        if it falls inside the dead time of an earlier registered click. The detector's
+        last_detection_time is carried over, so consecutive blocks chain correctly.
+        """
+        times = np.asarray(times, dtype=float)
+        keep = np.zeros(times.size, dtype=bool)
+        if times.size == 0:
+            return keep
+
+        order = np.argsort(times, kind="stable")  # jitter can swap neighbouring clicks
+        sorted_times = times[order]
+        sorted_keep = np.zeros(times.size, dtype=bool)
+
+        gaps = np.diff(sorted_times, prepend=self.last_detection_time)
+        if np.all(gaps >= self.dead_time):
+            # sparse clicks (long links): nothing to gate, skip the sweep
+            sorted_keep[:] = True
+        else:
+            # single sweep, jumping straight to the first click after each dead window
+            i = np.searchsorted(sorted_times, self.last_detection_time + self.dead_time)
+            while i < sorted_times.size:
+                sorted_keep[i] = True
+                i = max(i + 1, np.searchsorted(sorted_times, sorted_times[i] + self.dead_time))
+
+        keep[order] = sorted_keep
+        if sorted_keep.any():
+            self.last_detection_time = sorted_times[sorted_keep][-1]
+        return keep
+
+    def click_probability(self, mean_photon_numbers, detection_window=1e-9, wavelength=None):
+        """
+        Expected click probability of a pulse with the given mean photon number (array or scalar),
+        ignoring dead time: a photon click with 1 - exp(-eta * mu), otherwise a dark count in the window.
+        """
+        eff = self.efficiency
+        if self.efficiency_spectrum and wavelength is not None:
+            eff = self.efficiency_spectrum(wavelength)
+        p_photon = 1 - np.exp(-eff * np.asarray(mean_photon_numbers, dtype=float))
+        p_dark = self.dark_count_rate * detection_window
+        return p_photon + (1 - p_photon) * p_dark
+
+    def live_fraction(self, click_rate):
+        """Fraction of clicks that register at a given attempted click rate (Hz): non-paralyzable dead time."""
+        return 1 / (1 + np.asarray(click_rate, dtype=float) * self.dead_time)
@@ -1,6 +1,7 @@
 import numpy as np
 from .pulse import Pulse
 from .state import QuantumState
+from .rng import make_rng
 
 class SinglePhotonSource:
     """
@@ -19,7 +20,8 @@ class SinglePhotonSource:
                  g2_target=None,
                  track_statistics=False,
                  p_polarization_error=0.0,  # New: probability of polarization error
-                 p_depolarize=0.0           # New: probability of depolarization
+                 p_depolarize=0.0,          # New: probability of depolarization
+                 rng=None                   # Seed / SeedSequence / RandomStream (see rng.make_rng)
                  ):
         self.wavelength = wavelength
         self.duration = duration
@@ -46,12 +48,13 @@ class SinglePhotonSource:
         # --- Error model parameters
         self.p_polarization_error = p_polarization_error
         self.p_depolarize = p_depolarize
+        self.rng = make_rng(rng)
 
     def _apply_polarization_error(self, qstate):
         """
         With probability p_polarization_error, apply a random polarization rotation (bit flip).
         """
-        if np.random.rand() < self.p_polarization_error:
+        if self.rng.random() < self.p_polarization_error:
             # Pauli X (bit-flip) for polarization: |H> <-> |V>
             X = np.array([[0, 1], [1, 0]])
             qstate.apply_gate(X)
@@ -61,7 +64,7 @@ class SinglePhotonSource:
         """
         With probability p_depolarize, depolarize the state.
         """
-        if np.random.rand() < self.p_depolarize:
+        if self.rng.random() < self.p_depolarize:
             qstate.depolarize()  # As defined in  QuantumState class: rho = I/2
         return qstate
 
@@ -81,13 +84,13 @@ class SinglePhotonSource:
         }
 
         # Emission logic (same as before)
-        if np.random.rand() < self.p_bg:
+        if self.rng.random() < self.p_bg:
             n_photons = 1
             is_background = True
-        elif np.random.rand() < self.p_multi:
+        elif self.rng.random() < self.p_multi:
             n_photons = 2
             is_background = False
-        elif np.random.rand() < self.eta_src:
+        elif self.rng.random() < self.eta_src:
             n_photons = 1
             is_background = False
         else:
@@ -113,9 +116,9 @@ class SinglePhotonSource:
 
         # --- Photon state and errors ---
         for i in range(n_photons):
-            jitter = np.random.normal(0, self.sigma_t)
+            jitter = self.rng.normal(0, self.sigma_t)
             photon_time = trigger_time + self.duration / 2 + jitter
-            lambda_shift = np.random.normal(0, self.sigma_lambda)
+            lambda_shift = self.rng.normal(0, self.sigma_lambda)
             lambda_actual = self.wavelength + lambda_shift
 
             photon_times.append(photon_time)
@@ -17,13 +17,28 @@ P1 = np.outer(ket_1, ket_1.conj())
 class QuantumState:
     def __init__(self, ket: np.ndarray=None, rho: np.ndarray=None):
         if rho is not None:
-            self.rho=rho
+            self.rho=np.array(rho)  # own copy: reset() reuses this buffer in place
             self.ket=None
         elif ket is not None:
             self.ket=ket
             self.rho=np.outer(ket, ket.conj())
         else:
             raise ValueError("Either ket or rho must be provided.")
+
+    def reset(self, ket: np.ndarray=None, rho: np.ndarray=None):
+        """Re-initialises this object in place (reusing its own rho buffer when shapes match), e.g. for pooled states."""
+        if rho is None:
+            if ket is None:
+                raise ValueError("Either ket or rho must be provided.")
+            if self.rho.shape == (ket.size, ket.size):
+                self.rho = np.outer(ket, ket.conj(), out=self.rho.astype(complex, copy=False))
+            else:
+                self.rho = np.outer(ket, ket.conj())
+        else:
+            self.rho = np.array(rho)  # own copy, never the caller's matrix
+        self.ket = ket
+        return self
+
     def apply_gate(self, U: np.ndarray):
         """Applies unitary gate to the state. """ #Have to modify this to apply multiple gates
         self.rho = U @ self.rho @ U.conj().T
@@ -37,13 +52,13 @@ class QuantumState:
         self.rho = np.eye(d) / d #ρ=I/d
         self.ket = None
         
-    def measure(self, projectors: list[np.ndarray]=[P0, P1], shots=1)->dict: 
+    def measure(self, projectors: list[np.ndarray]=[P0, P1], shots=1, rng=None)->dict: 
         '''Here, projectors are used to define the measurement basis'''
         probabilities = [np.real(np.trace(P @ self.rho)) for P in projectors] #pi=Tr(Pi ρ), here rho is the state we're measuring, Pi is the projector of the ith basis and pi is the probability of collapsing in that basis/
         
         probabilities = np.array(probabilities) #it was already an array, but np.array gives vectorized methods(i.e you don't need for loops to apply stuff over all elements)
         probabilities /= probabilities.sum() #normalise
-        outcomes = np.random.choice(len(projectors), size=shots, p=probabilities) # p gives the probability distribution over all projectors
+        outcomes = (np.random if rng is None else rng).choice(len(projectors), size=shots, p=probabilities) # p gives the probability distribution over all projectors
         #mimics collapse
         if shots==1:
             outcome=outcomes.item()
@@ -56,4 +71,105 @@ class QuantumState:
         counts = Counter(outcomes)
         return dict(counts)
 
-    
\ No newline at end of file
+    
+# ---- Pauli-basis backend for 1-2 qubit states ----
+# rho = (1/d) * sum_k c_k P_k over the Pauli strings P_k, with c_k = Tr(P_k rho).
+# For one qubit c = (1, Bloch vector); for two qubits c holds the local Bloch vectors and the
+# 3x3 correlation tensor. Gates and projectors act on c through small real matrices that are
+# computed once per distinct matrix and cached, so each gate or measurement is a few multiply-adds.
+_I2 = np.eye(2, dtype=complex)
+_PAULIS = [_I2,
+           np.array([[0, 1], [1, 0]], dtype=complex),
+           np.array([[0, -1j], [1j, 0]], dtype=complex),
+           np.array([[1, 0], [0, -1]], dtype=complex)]
+PAULI_BASIS = {
+    2: np.array(_PAULIS),                                          # I, X, Y, Z
+    4: np.array([np.kron(a, b) for a in _PAULIS for b in _PAULIS]),  # II, IX, ..., ZZ
+}
+_gate_tables = {}       # (d, U bytes): R with c' = R @ c
+_projector_tables = {}  # (d, P bytes): (v, M) with p = v @ c and c' = (M @ c) / p
+
+
+def _pauli_coefficients(rho):
+    basis = PAULI_BASIS[rho.shape[0]]
+    return np.real(np.einsum('kij,ji->k', basis, rho))
+
+
+def _gate_table(U):
+    d = U.shape[0]
+    key = (d, U.tobytes())
+    R = _gate_tables.get(key)
+    if R is None:
+        basis = PAULI_BASIS[d]
+        # R[k, l] = Tr(P_k U P_l U^dagger) / d
+        conj = np.einsum('ij,ljk,mk->lim', U, basis, U.conj())
+        R = _gate_tables[key] = np.real(np.einsum('kij,lji->kl', basis, conj)) / d
+    return R
+
+
+def _projector_table(P):
+    d = P.shape[0]
+    key = (d, P.tobytes())
+    table = _projector_tables.get(key)
+    if table is None:
+        basis = PAULI_BASIS[d]
+        # v[k] = Tr(P P_k) / d,  M[k, l] = Tr(P_k P P_l P) / d
+        v = np.real(np.einsum('ij,kji->k', P, basis)) / d
+        sandwiched = np.einsum('ij,ljk,km->lim', P, basis, P)
+        M = np.real(np.einsum('kij,lji->kl', basis, sandwiched)) / d
+        table = _projector_tables[key] = (v, M)
+    return table
+
+
+class PauliState:
+    """
+    Drop-in alternative to QuantumState for 1- and 2-qubit states, stored as Pauli coefficients
+    (Bloch vector / two-qubit correlation tensor) instead of a density matrix.
+    Same apply_gate / depolarize / measure API; rho is rebuilt on demand.
+    """
+    def __init__(self, ket: np.ndarray=None, rho: np.ndarray=None):
+        if rho is None:
+            if ket is None:
+                raise ValueError("Either ket or rho must be provided.")
+            rho = np.outer(ket, ket.conj())
+        if rho.shape[0] not in PAULI_BASIS:
+            raise ValueError("PauliState supports 1 and 2 qubit states only.")
+        self.dim = rho.shape[0]
+        self.coeffs = _pauli_coefficients(rho)
+        self.ket = ket
+
+    def reset(self, ket: np.ndarray=None, rho: np.ndarray=None):
+        """Re-initialises this object in place, e.g. for pooled states."""
+        self.__init__(ket=ket, rho=rho)
+        return self
+
+    @property
+    def rho(self):
+        return np.einsum('k,kij->ij', self.coeffs, PAULI_BASIS[self.dim]) / self.dim
+
+    def apply_gate(self, U: np.ndarray):
+        """Applies unitary gate to the state."""
+        self.coeffs = _gate_table(U) @ self.coeffs
+        self.ket = None
+        return self
+
+    def depolarize(self):
+        """Simulate complete depolarization: I/d"""
+        self.coeffs = np.zeros(self.dim ** 2)
+        self.coeffs[0] = 1.0
+        self.ket = None
+
+    def measure(self, projectors: list[np.ndarray]=[P0, P1], shots=1, rng=None)->dict:
+        tables = [_projector_table(P) for P in projectors]
+        probabilities = np.array([v @ self.coeffs for v, _ in tables])
+        probabilities /= probabilities.sum()
+        outcomes = (np.random if rng is None else rng).choice(len(projectors), size=shots, p=probabilities)
+        if shots==1:
+            outcome=outcomes.item()
+            _, M = tables[outcome]
+            self.coeffs = (M @ self.coeffs) / probabilities[outcome]
+            self.ket = None
+            return outcome
+
+        counts = Counter(outcomes)
+        return dict(counts)
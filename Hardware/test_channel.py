@@ -0,0 +1,31 @@
+import numpy as np
+import sys
+import os
+
+# Ensure parent directory is in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Hardware.channel import QuantumChannel
+
+num_pulses = 1_000_000
+
+print("=== Test 1: 10 km, surviving_indices matches the transmittance ===")
+channel = QuantumChannel("test", length_meters=10_000, attenuation_db_per_m=0.0002, rng=1)
+idx = channel.surviving_indices(num_pulses)
+print(f"Expected ~{num_pulses * channel.transmittance():.0f} survivors, got {idx.size}")
+assert np.all(np.diff(idx) > 0) and idx[0] >= 0 and idx[-1] < num_pulses
+
+print("\n=== Test 2: 100 km (p = 1e-2), geometric skip sampling ===")
+channel = QuantumChannel("test", length_meters=100_000, attenuation_db_per_m=0.0002, rng=2)
+idx = channel.surviving_indices(num_pulses)
+print(f"Expected ~{num_pulses * channel.transmittance():.0f} survivors, got {idx.size}")
+assert np.all(np.diff(idx) > 0) and idx[0] >= 0 and idx[-1] < num_pulses
+
+# Geometric gaps saturate at the int64 maximum here; their sum used to wrap to negative indices
+# (1000 km) or never pass num_pulses (2000 km, endless loop).
+for km, p in ((1000, "1e-20"), (2000, "1e-40")):
+    print(f"\n=== Test: {km} km (p = {p}), nothing arrives ===")
+    channel = QuantumChannel("test", length_meters=km * 1000, attenuation_db_per_m=0.0002, rng=3)
+    idx = channel.surviving_indices(num_pulses)
+    print(f"Expected: [], Got: {idx}")
+    assert idx.size == 0 or (idx[0] >= 0 and idx[-1] < num_pulses and np.all(np.diff(idx) > 0))
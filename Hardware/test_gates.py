@@ -28,3 +28,10 @@ print("\n=== Test 3: Start in |0⟩, no gate, measure directly ===")
 state3 = QuantumState(ket_0)
 result3 = state3.measure(projectors)
 print(f"Expected: 0, Got: {result3}")
+
+print("\n=== Test 4: reset() leaves the caller's rho untouched ===")
+rho = np.eye(2, dtype=complex) / 2
+state4 = QuantumState(rho=rho)
+state4.reset(ket=ket_1)
+print(f"Expected: [0.5, 0.5], Got: {np.real(np.diag(rho)).tolist()}")
+assert np.allclose(rho, np.eye(2) / 2)
@@ -12,6 +12,7 @@ from Hardware.snspd import SNSPD
 from Hardware.PBS import PolarizingBeamSplitter
 from Hardware.HWP import HalfWavePlate
 from utils import key_rate
+from Hardware.rng import spawn
 
 # Error parameters (tune as needed)
 POL_ERR_STD = 1.0            # degrees → perfect polarization preservation
@@ -30,10 +31,23 @@ alice_hwp_bit_map = {0: 0, 45: 1, -22.5: 0, 22.5: 1}
 bob_hwp_basis_map = {0: 'plus', 22.5: 'cross'}
 bob_hwp_bit_map = {0: 0, 22.5: 1}
 
+# Same mappings as arrays for run_bb84_batch (basis: 0 = 'plus', 1 = 'cross')
+ALICE_HWP_ANGLES = np.array([0, 45, -22.5, 22.5])
+ALICE_BASES = np.array([0, 0, 1, 1], dtype=np.int8)
+ALICE_BITS = np.array([0, 1, 0, 1], dtype=np.int8)
+BOB_HWP_ANGLES = np.array([0, 22.5])
+
+PULSE_INTERVAL = 1e-9        # s → 1 GHz clock
+PULSE_DURATION = 70e-12      # s
+MEAN_PHOTON_NUMBER = 10
+BATCH_SIZE = 2_000_000       # pulses per NumPy block in run_bb84_batch
+
 class Alice(Node):
-    def __init__(self, node_id, env, num_pulses):
-        super().__init__(node_id, env)
+    def __init__(self, node_id, env, num_pulses, rng=None):
+        node_seed, hwp_seed = spawn(rng, 2)
+        super().__init__(node_id, env, node_seed)
         self.assign_port('q', 'quantum')
+        self.hwp = HalfWavePlate(theta_deg=0, rng=hwp_seed)  # re-set per pulse
         self.num_pulses = num_pulses
         self.pulses = []
         self.hwp_angles = []
@@ -45,8 +59,9 @@ class Alice(Node):
         self.sent_bits = {}    # pulse_id: bit
         self.sent_bases = {}   # pulse_id: basis
         self.sent_pulses = []  # optional: store pulses
+        angles = self.rng.choice(ALICE_HWP_ANGLES, size=self.num_pulses).tolist()  # drawn for the whole train at once
         for i in range(self.num_pulses):
-            hwp_angle = np.random.choice([0, 45, -22.5, 22.5])
+            hwp_angle = angles[i]
             basis = alice_hwp_basis_map[hwp_angle]
             bit = alice_hwp_bit_map[hwp_angle]
 
@@ -54,11 +69,10 @@ class Alice(Node):
             self.bases.append(basis)
             self.bits.append(bit)
 
-            pulse = Pulse(wavelength=1550e-9, duration=70e-12, amplitude=1.0, polarization=0.0)
-            pulse.mean_photon_number = 10
+            pulse = Pulse(wavelength=1550e-9, duration=70e-12, amplitude=1.0, polarization=0.0, mean_photon_number=10)
             pulse.pulse_id = i  # easier to use for qber calculation
-            hwp = HalfWavePlate(theta_deg=hwp_angle)
-            pulse = hwp.apply(pulse)
+            self.hwp.theta_deg = hwp_angle
+            pulse = self.hwp.apply(pulse)
 
             self.after_hwp_pols.append(pulse.polarization)
             self.pulses.append(pulse)
@@ -74,25 +88,30 @@ class Alice(Node):
 
 
 class Bob(Node):
-    def __init__(self, node_id, env):
-        super().__init__(node_id, env)
+    def __init__(self, node_id, env, rng=None):
+        node_seed, h_seed, v_seed, pbs_seed, hwp_seed = spawn(rng, 5)
+        super().__init__(node_id, env, node_seed)
         self.assign_port('q', 'quantum')
         self.snspd_H = SNSPD(
             efficiency=SNSPD_EFFICIENCY,
             dark_count_rate=DARK_COUNT_RATE,
             dead_time=30e-9,
-            timing_jitter=SNSPD_JITTER
+            timing_jitter=SNSPD_JITTER,
+            rng=h_seed
         )
         self.snspd_V = SNSPD(
             efficiency=SNSPD_EFFICIENCY,
             dark_count_rate=DARK_COUNT_RATE,
             dead_time=30e-9,
-            timing_jitter=SNSPD_JITTER
+            timing_jitter=SNSPD_JITTER,
+            rng=v_seed
         )
         self.pbs = PolarizingBeamSplitter(
             extinction_ratio_db=PBS_EXTINCTION_DB,
-            angle_jitter_std=PBS_ANGLE_JITTER_STD
+            angle_jitter_std=PBS_ANGLE_JITTER_STD,
+            rng=pbs_seed
         )
+        self.hwp = HalfWavePlate(theta_deg=0, rng=hwp_seed)  # re-set per pulse
         self.basis_angles = []
         self.bases = []
         self.bits = []
@@ -108,18 +127,18 @@ class Bob(Node):
             return
 
         # --- Channel polarization noise ---
-        data.polarization = (data.polarization + np.random.normal(0, POL_ERR_STD)) % 180
+        data.polarization = (data.polarization + self.rng.normal(0, POL_ERR_STD)) % 180
 
         # --- Bob's HWP setting with error ---
-        hwp_angle_nom = np.random.choice([0, 22.5])
-        hwp_angle = hwp_angle_nom + np.random.normal(0, BOB_HWP_ERR_STD)
+        hwp_angle_nom = self.rng.choice([0, 22.5])
+        hwp_angle = hwp_angle_nom + self.rng.normal(0, BOB_HWP_ERR_STD)
         basis = bob_hwp_basis_map[hwp_angle_nom]
         bit = bob_hwp_bit_map[hwp_angle_nom]
         self.basis_angles.append(hwp_angle_nom)
         self.bases.append(basis)
         self.bits.append(bit)
-        hwp = HalfWavePlate(theta_deg=hwp_angle)
-        data = hwp.apply(data)
+        self.hwp.theta_deg = hwp_angle
+        data = self.hwp.apply(data)
         self.det_pols.append(data.polarization)
         port = self.pbs.split(data)
         if port == 'H':
@@ -159,27 +178,21 @@ def run_bb84(alice: Alice, bob: Bob, channel:QuantumChannel, env, num_pulses=100
     total_time = num_pulses * 1e-9 + 5e-9
     env.run(until=total_time)
 
-    # only loop over pulses that both parties actually processed
-    n = min(len(alice.bits), len(bob.bits), len(bob.clicks))
-    sifted_alice = []
-    sifted_bob   = []
-
-    for i in range(n):
-        # basis‐match check
-        if alice.bases[i] != bob.bases[i]:
-            continue
-        common_ids = set(bob.received_ids) & set(alice.sent_bits.keys())
-        # derive Bob's bit
-        for pid in common_ids:
-            if alice.sent_bases[pid] == bob.received_bases[pid]:
-                sifted_alice.append(alice.sent_bits[pid])
-                sifted_bob.append(bob.received_bits[pid])
+    # sifting over Bob's clicks only: a boolean mask of the pulses where both used the same basis
+    with alice.perf.stage("sifting"):
+        ids = np.asarray(bob.received_ids, dtype=np.int64)
+        bob_bases = np.array([bob.received_bases[pid] for pid in bob.received_ids])
+        bob_bits = np.array([bob.received_bits[pid] for pid in bob.received_ids], dtype=np.int8)
+        same_basis = np.asarray(alice.bases)[ids] == bob_bases if ids.size else np.zeros(0, dtype=bool)
+        sifted_alice = np.asarray(alice.bits, dtype=np.int8)[ids][same_basis]
+        sifted_bob = bob_bits[same_basis]
+    alice.perf.count("sifted_bits", len(sifted_alice))
 
     sim_time = (num_pulses) * 1e-9
     sifted_key_rate = len(sifted_alice) / sim_time
 
-    if sifted_alice:
-        errors = sum(a != b for a, b in zip(sifted_alice, sifted_bob))
+    if len(sifted_alice):
+        errors = int(np.count_nonzero(sifted_alice != sifted_bob))
         qber   = errors / len(sifted_alice)
         
         asym_key_rate=key_rate.compute_key_rate(qber, sifted_key_rate)
@@ -189,24 +202,118 @@ def run_bb84(alice: Alice, bob: Bob, channel:QuantumChannel, env, num_pulses=100
     else:
         return None, None
         print("No sifted bits to compute QBER.")
-   
 
-def node_factory(name, role, env, num_pulses=10000):
+
+def run_bb84_batch(alice: Alice, bob: Bob, channel: QuantumChannel, env, num_pulses=1000000, batch_size=BATCH_SIZE, **kwargs):
+    """
+    Batch execution mode for BB84: Alice's HWP angles, bases and bits, Bob's basis
+    choices, PBS routing and SNSPD clicks are NumPy arrays over blocks of the pulse
+    train. Sifting is a boolean mask and QBER a vectorized comparison, so the cost
+    is linear in num_pulses. Returns (qber, asym_key_rate) like run_bb84; no per-pulse log is
+    written, so the last send and receive times are set on alice.last_sent_time and bob.last_recv_time.
+    """
+    alice.connect_nodes('q', 'q', bob, channel)
+
+    delay = channel.compute_delay()
+    alice_hwp = alice.hwp
+    bob_hwp = bob.hwp
+
+    sifted = 0
+    errors = 0
+    last_arrival = None
+    for start in range(0, num_pulses, batch_size):
+        n = min(batch_size, num_pulses - start)
+
+        # --- Channel loss first: lost pulses never influence the key, so only survivors are prepared ---
+        arrived = channel.surviving_indices(n)
+        assert not arrived.size or (arrived[0] >= 0 and arrived[-1] < n), "surviving_indices out of range"
+        if arrived.size:
+            last_arrival = float((start + arrived[-1]) * PULSE_INTERVAL + delay)
+
+        # --- Alice: HWP setting per pulse fixes basis and bit ---
+        choice = alice.rng.integers(0, 4, arrived.size)
+        alice_bases = ALICE_BASES[choice]
+        alice_bits = ALICE_BITS[choice]
+        pols = alice_hwp.apply_batch(np.zeros(arrived.size), theta_deg=ALICE_HWP_ANGLES[choice])
+        pols = (pols + bob.rng.normal(0, POL_ERR_STD, arrived.size)) % 180
+
+        # --- Bob: basis choice, HWP, PBS routing ---
+        bob_bases = bob.rng.integers(0, 2, arrived.size).astype(np.int8)
+        bob_theta = BOB_HWP_ANGLES[bob_bases] + bob.rng.normal(0, BOB_HWP_ERR_STD, arrived.size)
+        ports = bob.pbs.split_batch(bob_hwp.apply_batch(pols, theta_deg=bob_theta))
+
+        # --- SNSPD clicks on the port each pulse was routed to ---
+        times = (arrived + start) * PULSE_INTERVAL + delay
+        on_h = np.flatnonzero(ports == 0)
+        on_v = np.flatnonzero(ports == 1)
+        clicked = np.zeros(arrived.size, dtype=bool)
+        clicked[on_h] = bob.snspd_H.detect_batch(times[on_h], MEAN_PHOTON_NUMBER, detection_window=PULSE_DURATION)[0]
+        clicked[on_v] = bob.snspd_V.detect_batch(times[on_v], MEAN_PHOTON_NUMBER, detection_window=PULSE_DURATION)[0]
+
+        # --- Sifting: Bob clicked and both used the same basis ---
+        valid = clicked & (alice_bases == bob_bases)
+        sifted += int(np.count_nonzero(valid))
+        errors += int(np.count_nonzero(alice_bits[valid] != ports[valid]))
+    alice.perf.count("sifted_bits", sifted)
+
+    sim_time = (num_pulses) * 1e-9
+    sifted_key_rate = sifted / sim_time
+    alice.last_sent_time = (num_pulses - 1) * PULSE_INTERVAL if num_pulses else None
+    bob.last_recv_time = last_arrival
+
+    if sifted:
+        qber = errors / sifted
+        asym_key_rate = key_rate.compute_key_rate(qber, sifted_key_rate)
+        return qber, asym_key_rate
+    else:
+        return None, None
+
+
+def estimate_bb84(alice: Alice, bob: Bob, channel: QuantumChannel, env, num_pulses=1000000, **kwargs):
+    """
+    Closed-form estimate of run_bb84 / run_bb84_batch: expected QBER and key rate from the channel
+    transmittance, the HWP angle errors and depolarization, the PBS jitter and extinction ratio and
+    the SNSPD efficiency, dark counts and dead time. Returns (qber, asym_key_rate).
+    """
+    t = channel.transmittance()
+    alice_hwp = alice.hwp
+    bob_hwp = bob.hwp
+
+    # polarization error at the PBS: both plates rotate by 2*theta, so their angle errors count twice
+    pol_err_std = np.sqrt((2 * alice_hwp.angle_error_std) ** 2 + POL_ERR_STD ** 2
+                          + 4 * (BOB_HWP_ERR_STD ** 2 + bob_hwp.angle_error_std ** 2))
+    depol_prob = 1 - (1 - alice_hwp.depol_prob) * (1 - bob_hwp.depol_prob)
+    right, wrong = bob.pbs.port_probabilities(0, pol_err_std, depol_prob)         # same basis
+    mismatched = sum(bob.pbs.port_probabilities(45, pol_err_std, depol_prob))  # other basis, mostly blocked
+
+    click = bob.snspd_H.click_probability(MEAN_PHOTON_NUMBER, PULSE_DURATION)
+    routed = 0.5 * (right + wrong) + 0.5 * mismatched
+    live = bob.snspd_H.live_fraction(t * routed / 2 * click / PULSE_INTERVAL)
+
+    sifted = num_pulses * t * 0.5 * (right + wrong) * click * live
+    qber = wrong / (right + wrong)
+    sim_time = (num_pulses) * 1e-9
+    asym_key_rate = key_rate.compute_key_rate(qber, sifted / sim_time)
+    return qber, asym_key_rate
+
+
+def node_factory(name, role, env, num_pulses=10000, rng=None):
     if role == "Sender":
-        return Alice(name, env, num_pulses=num_pulses)
+        return Alice(name, env, num_pulses=num_pulses, rng=rng)
     elif role == "Receiver":
         
-         return Bob(name, env) #here name=node_id
+         return Bob(name, env, rng=rng) #here name=node_id
     else:
-        return Node(name, env)
+        return Node(name, env, rng)
 
 
-def channel_factory (a, b, length_meters, attenuation_db_per_m, depol_prob, pol_err_std=None):
+def channel_factory (a, b, length_meters, attenuation_db_per_m, depol_prob, pol_err_std=None, rng=None):
     return QuantumChannel(
         name=f"{a}_{b}",
         length_meters=length_meters,
         attenuation_db_per_m= attenuation_db_per_m,
         depol_prob=depol_prob,
-        pol_err_std=pol_err_std
+        pol_err_std=pol_err_std,
+        rng=rng
     )
 
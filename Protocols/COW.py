@@ -11,117 +11,117 @@ from Hardware.lasers import Laser
 from Hardware.channel import QuantumChannel
 from Hardware.snspd import SNSPD
 from Hardware.MZI import MachZehnderInterferometer  
+from Hardware.rng import spawn
+from utils.perf import instrument_channel
 def quantize_time(t, bin_width=1e-9): #basically returns x ns as x
     return round(t / bin_width)
 
 class Alice(Node):
-    def __init__(self, node_id, env, num_pulses, decoy_prob):
-        super().__init__(node_id, env)
+    def __init__(self, node_id, env, num_pulses, decoy_prob, rng=None):
+        super().__init__(node_id, env, rng)
         self.env = env
         self.num_pulses = num_pulses
         self.decoy_prob = decoy_prob
-        self.bit_log = [] # bit, is_decoy
+        self.bits = np.full(num_pulses, -1, dtype=np.int8)  # bit of time-bin pair j, -1 for decoys
+        self.pairs_started = 0
         #self.actual_key = []
 
     def run(self, port_id):
         laser = Laser(wavelength=1550e-9, amplitude=1.0)
         self.add_component("laser", laser)
 
-        for _ in range(self.num_pulses):
-            is_decoy = np.random.rand() < self.decoy_prob
+        # decoy flags and bits for the whole run at once
+        decoys = (self.rng.random(self.num_pulses) < self.decoy_prob).tolist()
+        bits = self.rng.integers(0, 2, self.num_pulses).tolist()
+        for j in range(self.num_pulses):
+            is_decoy = decoys[j]
             bit = None
-            indices = [0, 1] if is_decoy else [np.random.choice([0, 1])]
-            self.bit_log.append((indices[0] if not is_decoy else None, is_decoy))
+            indices = [0, 1] if is_decoy else [bits[j]]
+            if not is_decoy:
+                self.bits[j] = indices[0]
+            self.pairs_started = j + 1
 
             for i in range(2):
                 if i in indices:
-                    pulse = laser.emit_pulse(duration=70e-12)
-                    pulse.mean_photon_number = 0.5
-                    if pulse.sample_photon_arrivals(): #poisson sampling, about 9% of the time gives 1.
+                    pulse = laser.emit_pulse(duration=70e-12, mean_photon_number=0.5)
+                    if pulse.sample_photon_arrivals(self.rng): #poisson sampling, about 9% of the time gives 1.
                         self.send(port_id, pulse)
                 yield self.env.timeout(2e-9)
 
 class Bob(Node):
-    def __init__(self, node_id, env, snspd:SNSPD,  monitor_ratio=0.0, threshold=5):
-        super().__init__(node_id, env)
+    def __init__(self, node_id, env, snspd:SNSPD,  monitor_ratio=0.0, threshold=5, rng=None):
+        node_seed, mzi_seed = spawn(rng, 2)
+        super().__init__(node_id, env, node_seed)
         self.monitor_ratio = monitor_ratio
         self.threshold = threshold
-        self.sifted_key = []
+        self.sifted_key_bins = np.empty(0, dtype=np.int64)  # time bins that gave a key bit
+        self.sifted_key_bits = np.empty(0, dtype=np.int8)
         self.monitor_results = []
-        self.time_bin_map = {}
-        self.last_processed_bin = None
+        self.click_bins = []       # sparse: time bin of every data-line click
+        self.monitor_pulses = []   # (arrival time, phase, mean photon number) of monitor-line pulses
         self.dm2_count = 0
-        self.last_monitor_pulse = None
         self.sns_detector = snspd
         self.mzi = MachZehnderInterferometer(
         visibility=0.98,
         phase_noise_std=0.02,
+        rng=mzi_seed,
     )
 
     def receive(self, pulse, receiver_port_id):
         super().receive(pulse, receiver_port_id)
         if pulse is None:
             return
-        if np.random.rand() < self.monitor_ratio: #10 percent of the time goes to monitor line
+        if self.rng.random() < self.monitor_ratio: #10 percent of the time goes to monitor line
             self._monitor_line(pulse)
         else:
             self._data_line(pulse) #90 perccent does to data line
 #this entire part should be replaced with detector logic, realisticlally, speaking
     def _data_line(self, pulse):
-        #bin_time = quantize_time(self.env.now)
-        
         click, detection_info = self.sns_detector.detect(pulse, self.env.now)
         if not click:
             return
-        bin_time = quantize_time(detection_info["detection_time"])
-        
-
-        self.time_bin_map[bin_time] = True
-        if self.last_processed_bin is not None:
-            for t in range(self.last_processed_bin + 1, bin_time):
-                self.time_bin_map[t] = False
-        self.last_processed_bin = bin_time
-       
-
+        self.click_bins.append(quantize_time(detection_info["detection_time"]))
 
     def _process_bin_pairs(self):
-        sorted_bins = sorted(self.time_bin_map.keys())
-        i = 0
-        while i < len(sorted_bins) - 1:
-            t1 = sorted_bins[i]
-            if t1 % 2 == 1: #odd bins
-                i += 1
-                continue
-            t2 = sorted_bins[i + 1]
-            if t2 != t1 + 1:  #non-consecutive
-                i += 1
-                continue
-            p1 = self.time_bin_map[t1] #gives true/false, depending on whether a pulse was observed
-            p2 = self.time_bin_map[t2]
-            if p1 and not p2:
-                self.sifted_key.append((t1, 0))
-            elif not p1 and p2:
-                self.sifted_key.append((t2, 1))
-            sorted_bins = sorted_bins[i+2:]  # Remove processed bins
-            i = 0
-
-    def _monitor_line(self, pulse):
-        if self.last_monitor_pulse is None:
-            self.last_monitor_pulse = pulse
+        """
+        Pairs even bin t with odd bin t+1 in one vectorized pass over the sorted click bins.
+        Only clicked bins are stored; every bin between the first and last click counts as observed,
+        so a click in exactly one bin of a pair gives a key bit (0 in the even bin, 1 in the odd bin).
+        """
+        bins = np.unique(np.asarray(self.click_bins, dtype=np.int64))
+        if bins.size == 0:
             return
+        first, last = bins[0], bins[-1]
+        even = bins % 2 == 0
+        partner_clicked = np.isin(np.where(even, bins + 1, bins - 1), bins)
+        bit0 = even & ~partner_clicked & (bins + 1 <= last)
+        bit1 = ~even & ~partner_clicked & (bins - 1 >= first)
 
-        bit, detection_info = self.mzi.measure(self.last_monitor_pulse, pulse, current_time=self.env.now)
-        if bit == 0:
-            self.monitor_results.append(('DM1', self.env.now))
-        elif bit == 1:
-            self.monitor_results.append(('DM2', self.env.now))
-            self.dm2_count += 1
+        key = bit0 | bit1
+        self.sifted_key_bins = bins[key]
+        self.sifted_key_bits = bit1[key].astype(np.int8)
 
-        self.last_monitor_pulse = None
+    def _monitor_line(self, pulse):
+        self.monitor_pulses.append((self.env.now, pulse.phase, pulse.mean_photon_number))
+
+    def _process_monitor_line(self):
+        """Interferes the monitor-line pulses pairwise (1st with 2nd, 3rd with 4th, ...) with one batched MZI measurement."""
+        m = len(self.monitor_pulses) // 2 * 2
+        if m == 0:
+            return
+        times, phases, mus = np.array(self.monitor_pulses[:m]).T
+        bits = self.mzi.measure_batch(phases[1::2] - phases[0::2], times[1::2], mus[0::2], detection_window=70e-12)
+        self.monitor_results = [('DM1' if bit == 0 else 'DM2', t) for bit, t in zip(bits, times[1::2]) if bit >= 0]
+        self.dm2_count = int(np.count_nonzero(bits == 1))
 
     def check_security(self):
         return self.dm2_count <= self.threshold
 
+def link_channel(rng=None):
+    # run_cow always simulates this short fibre, whatever channel it is given
+    return QuantumChannel("Alice_Bob_Channel", length_meters=10, attenuation_db_per_m=0.0003, depol_prob=0.0, rng=rng)
+
+
 def run_cow(alice, bob, channel, env, num_pulses=1000):
     #env = simpy.Environment()
     #num_pulses = 10000
@@ -132,76 +132,105 @@ def run_cow(alice, bob, channel, env, num_pulses=1000):
     alice.assign_port("qport", "quantum_out")
     bob.assign_port("qport", "quantum_in")
 
-    channel = QuantumChannel("Alice_Bob_Channel", length_meters=10, attenuation_db_per_m=0.0003, depol_prob=0.0)
+    channel = link_channel(channel.rng if channel is not None else None)  # keeps the link's random stream
+    instrument_channel(alice.perf, channel)  # no-op unless perf is on
     alice.connect_nodes("qport", "qport", bob, channel)
 
     env.process(alice.run("qport"))
     env.run(until=(num_pulses + 50) * 1e-9)
-    bob._process_bin_pairs()
+    with alice.perf.stage("sifting"):
+        bob._process_bin_pairs()
+        bob._process_monitor_line()
 
 
-    delay = channel.compute_delay()
-    bin_delay = round(delay / 1e-9)
+        delay = channel.compute_delay()
+        bin_delay = round(delay / 1e-9)
 
-    alice_key = {}
-    current_bin = 0
-    for bit, is_decoy in alice.bit_log:
-        for i in range(2):
-            if is_decoy or bit is None:
-                current_bin += 1
-                continue
-            if (bit == 0 and i == 0) or (bit == 1 and i == 1):
-                alice_key[current_bin + bin_delay] = bit
-            current_bin += 1
+        # Alice's key as index arrays: pair j with bit b has its pulse in bin 2j + b, shifted by the channel delay
+        pairs = np.flatnonzero(alice.bits[:alice.pairs_started] >= 0)
+        alice_key_bits = alice.bits[pairs]
+        alice_key_bins = 2 * pairs + alice_key_bits + bin_delay
 
-
-    bob_key = {t: b for t, b in bob.sifted_key}
-    common = set(alice_key) & set(bob_key)
-    errors = sum(1 for t in common if alice_key[t] != bob_key[t])
-    qber = errors / len(common) if common else 0
+        common, ia, ib = np.intersect1d(alice_key_bins, bob.sifted_key_bins, assume_unique=True, return_indices=True)
+        errors = int(np.count_nonzero(alice_key_bits[ia] != bob.sifted_key_bits[ib]))
+    alice.perf.count("sifted_bits", len(common))
+    qber = errors / len(common) if len(common) else 0
     sim_time = (num_pulses + 10) * 1e-9
     sifted_key_rate = len(common) / sim_time
     asym_key_rate=key_rate.compute_key_rate(qber, sifted_key_rate)
     return qber, asym_key_rate
     
     print("Alice pulses sent:", num_pulses * 2)
-    print("Bob sifted bits  :", len(bob.sifted_key))
-    print("Matched key bits :", sorted(common))
+    print("Bob sifted bits  :", len(bob.sifted_key_bins))
+    print("Matched key bits :", common)
     print("QBER             :", qber)
     print("Raw Key Rate     : {:.2f} bits/sec".format(rate))
     print("\n--- Bit mismatches ---")
-    for t in sorted(common):
-        if alice_key[t] != bob_key[t]:
-            print(f"Mismatch at bin {t}: Alice={alice_key[t]}, Bob={bob_key[t]}")
+    for t, a, b in zip(common, alice_key_bits[ia], bob.sifted_key_bits[ib]):
+        if a != b:
+            print(f"Mismatch at bin {t}: Alice={a}, Bob={b}")
 
     if not bob.check_security():
         print("Protocol aborted due to high DM2 counts.")
   
   
   
-env = simpy.Environment()       
-def node_factory(name, role, env, **kwargs):
+def estimate_cow(alice, bob, channel, env, num_pulses=1000, **kwargs):
+    """
+    Closed-form estimate of run_cow: expected QBER and key rate from the decoy probability,
+    the channel transmittance, Bob's monitor ratio and the SNSPD efficiency, dark counts and dead time.
+    Follows run_cow's timing: one slot every 2 ns (two per pair) against 1 ns key bins, so Alice's
+    key bin 2j + bit lines up with Bob's click in slot j, and only bit-0 pairs can match.
+    run_cow always simulates the fixed 10 m link_channel, so neither function depends on the link
+    distance. Its QBER is 0 by construction: Bob's bit is the parity of his click bin, which can only
+    match Alice's key bin 2j + bit + delay (even delay) when that parity is her bit, and the data-line
+    detector only draws dark counts when a pulse arrives, in that same bin. MZI visibility only affects the monitor line (DM2 counts), not the key.
+    Returns (qber, asym_key_rate).
+    """
+    channel = link_channel()
+    mu, slot = 0.5, 2e-9
+    t = channel.transmittance()
+    pairs = min(alice.num_pulses, int(np.ceil((num_pulses + 50) * 1e-9 / (2 * slot))))
+
+    p_pulse = alice.decoy_prob + (1 - alice.decoy_prob) / 2           # a given slot carries a pulse
+    p_sent = 1 - np.exp(-mu)                                           # at least one photon was emitted
+    click = bob.sns_detector.click_probability(mu, 70e-12)
+    p_click = p_pulse * p_sent * t * (1 - bob.monitor_ratio) * click   # per slot, before dead time
+    p_click *= bob.sns_detector.live_fraction(p_click / slot)
+
+    p_key = (1 - alice.decoy_prob) / 2                                 # Alice's entry j is a bit-0 pair
+    sifted = pairs * p_key * p_click
+    qber = 0.0  # see above: no data-line error mechanism in run_cow
+    sim_time = (num_pulses + 10) * 1e-9
+    asym_key_rate = key_rate.compute_key_rate(qber, sifted / sim_time)
+    return qber, asym_key_rate
+
+
+def node_factory(name, role, env, rng=None, **kwargs):
     if role == "Sender":
-        return Alice(name, env, num_pulses=kwargs.get("num_pulses", 1000), decoy_prob=kwargs.get("decoy_prob", 0.1))
+        return Alice(name, env, num_pulses=kwargs.get("num_pulses", 1000), decoy_prob=kwargs.get("decoy_prob", 0.1), rng=rng)
     elif role == "Receiver":
+        node_seed, snspd_seed = spawn(rng, 2)
         snspd = SNSPD(
             efficiency=kwargs.get("efficiency", 0.9),
             dark_count_rate=kwargs.get("dark_count_rate", 10),
             dead_time=kwargs.get("dead_time", 30e-9),
-            timing_jitter=kwargs.get("timing_jitter", 30e-12)
+            timing_jitter=kwargs.get("timing_jitter", 30e-12),
+            rng=snspd_seed
         )
-        return Bob(name, env, snspd)
+        return Bob(name, env, snspd, rng=node_seed)
     else:
-        return Node(name, env)
+        return Node(name, env, rng)
 
 
  
 
-def channel_factory (a, b, length_meters, attenuation_db_per_m, depol_prob, pol_err_std=None):
+def channel_factory (a, b, length_meters, attenuation_db_per_m, depol_prob, pol_err_std=None, rng=None):
     return QuantumChannel(
         name=f"{a}_{b}",
         length_meters=length_meters,
         attenuation_db_per_m= attenuation_db_per_m,
         depol_prob=depol_prob,
-        pol_err_std=pol_err_std
+        pol_err_std=pol_err_std,
+        rng=rng
     )
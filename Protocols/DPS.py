@@ -13,11 +13,17 @@ from Hardware.lasers import Laser
 from Hardware.sps import SinglePhotonSource
 from Hardware.state import QuantumState
 from Hardware.MZI import MachZehnderInterferometer
+from Hardware.rng import spawn
+
+PULSE_INTERVAL = 1e-9        # s → 1 GHz clock
+PULSE_DURATION = 70e-12      # s
+MEAN_PHOTON_NUMBER = 0.2     # weak coherent pulses
+BATCH_SIZE = 2_000_000       # pulses per NumPy block in run_dps_batch (bounds memory for 10^8 pulse runs)
 
 
 class Alice(Node):
-    def __init__(self, node_id, env, num_pulses):
-        super().__init__(node_id, env)
+    def __init__(self, node_id, env, num_pulses, rng=None):
+        super().__init__(node_id, env, rng)
         self.num_pulses = num_pulses
         self.sent_phases = []
         self.sent_pulses = []
@@ -25,22 +31,34 @@ class Alice(Node):
     def run(self, port_id):
         laser = Laser(wavelength=1550e-9, amplitude=1.0)
         start = time.perf_counter()
+        phases = np.pi * self.rng.integers(0, 2, self.num_pulses)  # drawn for the whole train at once
         for i in range(self.num_pulses):
-            phase = np.random.choice([0, np.pi])
-            pulse = laser.emit_pulse(duration=70e-12, phase=phase)
-            pulse.mean_photon_number = 0.2
+            phase = phases[i]
+            pulse = laser.emit_pulse(duration=PULSE_DURATION, phase=phase, mean_photon_number=MEAN_PHOTON_NUMBER)
             pulse.pulse_id = i
             self.sent_phases.append(phase)
             self.sent_pulses.append(pulse)
             self.send(port_id, pulse)
-            yield self.env.timeout(1e-9)  # 1 ns pulse interval
+            yield self.env.timeout(PULSE_INTERVAL)  # 1 ns pulse interval
         end = time.perf_counter()
         print(f"[ALICE] Time to send pulses: {end - start:.2f}s")
 
+    def run_skipping(self, port_id):
+        """Same train as run, but only pulses that survive the channel get a SimPy event (Node.send_train)."""
+        laser = Laser(wavelength=1550e-9, amplitude=1.0)
+        self.sent_phases = np.pi * self.rng.integers(0, 2, self.num_pulses)  # indexed by pulse_id in run_dps
+
+        def make_pulse(i):
+            pulse = laser.emit_pulse(duration=PULSE_DURATION, phase=self.sent_phases[i], mean_photon_number=MEAN_PHOTON_NUMBER)
+            pulse.pulse_id = int(i)
+            return pulse
+
+        yield from self.send_train(port_id, self.num_pulses, PULSE_INTERVAL, make_pulse)
+
 
 class Bob(Node):
-    def __init__(self, node_id, env, mzi):
-        super().__init__(node_id, env)
+    def __init__(self, node_id, env, mzi, rng=None):
+        super().__init__(node_id, env, rng)
         self.mzi = mzi
         self.received_pulses = []
         self.pulse_times = []
@@ -67,7 +85,7 @@ class Bob(Node):
             self.det_info.append(info)
 
 
-def run_dps(alice: Alice, bob: Bob, channel:QuantumChannel, env, num_pulses=10_00_000, **kwargs):
+def run_dps(alice: Alice, bob: Bob, channel:QuantumChannel, env, num_pulses=10_00_000, skip_lost_pulses=False, **kwargs):
     
 
     alice.assign_port("qport", "quantum_out")
@@ -75,34 +93,37 @@ def run_dps(alice: Alice, bob: Bob, channel:QuantumChannel, env, num_pulses=10_0
     alice.connect_nodes("qport", "qport", bob, channel)
 
     # --- Run Simulation ---
-    env.process(alice.run("qport"))
+    # skip_lost_pulses: only schedule events for pulses that survive the channel
+    env.process(alice.run_skipping("qport") if skip_lost_pulses else alice.run("qport"))
     sim_time = (num_pulses + 10) * 1e-6
     env.run(until=sim_time)
 
    
 
 
-    bob_ids, bob_next_ids, bob_bits = zip(*bob.bits) if bob.bits else ([], [], [])
+    with alice.perf.stage("sifting"):
+        bob_ids, bob_next_ids, bob_bits = zip(*bob.bits) if bob.bits else ([], [], [])
 
     
-    alice_bits_for_bob = []
-    for prev_id, next_id in zip(bob_ids, bob_next_ids):
-        if prev_id is None or next_id is None:
-            alice_bits_for_bob.append(None)
-            continue
-        # Only compare if indices are adjacent (should be for proper DPS key)
-        if next_id - prev_id == 1:
-            phase_diff = (alice.sent_phases[next_id] - alice.sent_phases[prev_id]) % (2 * np.pi)
-            bit = 0 if abs(phase_diff) < 1e-6 or abs(phase_diff - 2 * np.pi) < 1e-6 else 1
-            alice_bits_for_bob.append(bit)
-        else:
-            alice_bits_for_bob.append(None)  # Or skip
-    # Filter out any Nones
-    final_alice_bits = [a for a in alice_bits_for_bob if a is not None]
-    final_bob_bits   = [b for a, b in zip(alice_bits_for_bob, bob_bits) if a is not None]
-
-    L = len(final_bob_bits)
-    errors = sum(a != b for a, b in zip(final_alice_bits, final_bob_bits))
+        alice_bits_for_bob = []
+        for prev_id, next_id in zip(bob_ids, bob_next_ids):
+            if prev_id is None or next_id is None:
+                alice_bits_for_bob.append(None)
+                continue
+            # Only compare if indices are adjacent (should be for proper DPS key)
+            if next_id - prev_id == 1:
+                phase_diff = (alice.sent_phases[next_id] - alice.sent_phases[prev_id]) % (2 * np.pi)
+                bit = 0 if abs(phase_diff) < 1e-6 or abs(phase_diff - 2 * np.pi) < 1e-6 else 1
+                alice_bits_for_bob.append(bit)
+            else:
+                alice_bits_for_bob.append(None)  # Or skip
+        # Filter out any Nones
+        final_alice_bits = [a for a in alice_bits_for_bob if a is not None]
+        final_bob_bits   = [b for a, b in zip(alice_bits_for_bob, bob_bits) if a is not None]
+
+        L = len(final_bob_bits)
+        errors = sum(a != b for a, b in zip(final_alice_bits, final_bob_bits))
+    alice.perf.count("sifted_bits", L)
     qber = errors / L if L else 0
     sim_time = (num_pulses + 10) * 1e-9
     sifted_key_rate = L / sim_time
@@ -111,42 +132,132 @@ def run_dps(alice: Alice, bob: Bob, channel:QuantumChannel, env, num_pulses=10_0
     print("QBER", qber)
     print( asym_key_rate)
     return qber, asym_key_rate
+
+
+def run_dps_batch(alice: Alice, bob: Bob, channel: QuantumChannel, env, num_pulses=10_00_000, batch_size=BATCH_SIZE, **kwargs):
+    """
+    Batch execution mode for DPS: same model as run_dps, but phases, channel loss,
+    MZI interference and SNSPD clicks are computed as NumPy arrays over blocks of
+    the pulse train instead of one SimPy event per pulse.
+    Returns (qber, asym_key_rate) like run_dps. No SimPy log is written per pulse, so the last
+    send and receive times of the train are set on alice.last_sent_time and bob.last_recv_time.
+    """
+    alice.assign_port("qport", "quantum_out")
+    bob.assign_port("qport", "quantum_in")
+    alice.connect_nodes("qport", "qport", bob, channel)
+
+    laser = Laser(wavelength=1550e-9, amplitude=1.0)
+    mzi = bob.mzi
+
+    delay = channel.compute_delay()
+    last_id, last_phase_bit = None, None  # last pulse Bob received in the previous block
+    sifted = 0
+    errors = 0
+    for start in range(0, num_pulses, batch_size):
+        n = min(batch_size, num_pulses - start)
+
+        # --- Channel loss first, so Alice only materialises (phase 0 or pi) the pulses that arrive ---
+        arrived = channel.surviving_indices(n)
+        assert not arrived.size or (arrived[0] >= 0 and arrived[-1] < n), "surviving_indices out of range"
+        received = laser.emit_train(n, PULSE_DURATION, PULSE_INTERVAL, phases=np.pi * alice.rng.integers(0, 2, arrived.size),
+                                    mean_photon_number=MEAN_PHOTON_NUMBER, start_time=start * PULSE_INTERVAL,
+                                    first_id=start, slots=arrived)
+        ids = received.ids
+        arrived_bits = (received.phases != 0).astype(np.int8)  # phase 0 / pi as 0 / 1
+        if last_id is not None:
+            ids = np.concatenate(([last_id], ids))
+            arrived_bits = np.concatenate(([last_phase_bit], arrived_bits))
+        if ids.size == 0:
+            continue
+        last_id, last_phase_bit = ids[-1], arrived_bits[-1]
+        if ids.size < 2:
+            continue
+
+        # --- Bob: MZI interferes each received pulse with the previously received one ---
+        prev_ids, next_ids = ids[:-1], ids[1:]
+        alice_bits = arrived_bits[1:] ^ arrived_bits[:-1]  # 0 if phases equal, 1 if they differ by pi
+        times = next_ids * PULSE_INTERVAL + delay
+        bob_bits = mzi.measure_batch(np.pi * alice_bits, times, MEAN_PHOTON_NUMBER, detection_window=PULSE_DURATION)
+
+        # --- Sifting: exactly one detector clicked, and the pair is adjacent in Alice's train ---
+        valid = (bob_bits >= 0) & (next_ids - prev_ids == 1)
+        sifted += int(np.count_nonzero(valid))
+        errors += int(np.count_nonzero(bob_bits[valid] != alice_bits[valid]))
+
+    alice.perf.count("sifted_bits", sifted)
+
+    qber = errors / sifted if sifted else 0
+    sim_time = (num_pulses + 10) * PULSE_INTERVAL
+    sifted_key_rate = sifted / sim_time
+    asym_key_rate = key_rate.compute_key_rate(qber, sifted_key_rate)
+    alice.last_sent_time = (num_pulses - 1) * PULSE_INTERVAL if num_pulses else None
+    bob.last_recv_time = float(last_id * PULSE_INTERVAL + delay) if last_id is not None else None
+    return qber, asym_key_rate
+
+
+def estimate_dps(alice: Alice, bob: Bob, channel: QuantumChannel, env, num_pulses=10_00_000, **kwargs):
+    """
+    Closed-form estimate of run_dps / run_dps_batch: expected QBER and key rate from the channel
+    transmittance, Bob's MZI visibility and phase noise and the SNSPD efficiency, dark counts and
+    dead time. Nothing is sampled, so it answers in microseconds. Returns (qber, asym_key_rate).
+    """
+    mzi = bob.mzi
+    t = channel.transmittance()
+
+    # dead time: each detector sees every received pulse, half of the photons on average
+    live = tuple(
+        snspd.live_fraction(t * snspd.click_probability(MEAN_PHOTON_NUMBER / 2, PULSE_DURATION) / PULSE_INTERVAL)
+        for snspd in (mzi.snspd0, mzi.snspd1)
+    )
+    right0, wrong0 = mzi.outcome_probabilities(0.0, MEAN_PHOTON_NUMBER, PULSE_DURATION, live)
+    wrong1, right1 = mzi.outcome_probabilities(np.pi, MEAN_PHOTON_NUMBER, PULSE_DURATION, live)
+    right, wrong = (right0 + right1) / 2, (wrong0 + wrong1) / 2
+
+    # a key bit needs two adjacent pulses to arrive and exactly one detector to click
+    sifted = max(num_pulses - 1, 0) * t * t * (right + wrong)
+    qber = wrong / (right + wrong) if right + wrong else 0
+    sim_time = (num_pulses + 10) * PULSE_INTERVAL
+    asym_key_rate = key_rate.compute_key_rate(qber, sifted / sim_time)
+    return qber, asym_key_rate
     
 
-def node_factory(name, role, env, num_pulses=10_00_000):
+def node_factory(name, role, env, num_pulses=10_00_000, rng=None):
     if role == "Sender":
-        return Alice(name, env, num_pulses=num_pulses)
+        return Alice(name, env, num_pulses=num_pulses, rng=rng)
     elif role == "Receiver":
-        snspd0 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12)
-        snspd1 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12)
-        mzi = MachZehnderInterferometer(snspd0=snspd0, snspd1=snspd1, visibility=0.98, phase_noise_std=0.2)
-        return Bob(name, env, mzi)
+        node_seed, seed0, seed1, mzi_seed = spawn(rng, 4)
+        snspd0 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12, rng=seed0)
+        snspd1 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12, rng=seed1)
+        mzi = MachZehnderInterferometer(snspd0=snspd0, snspd1=snspd1, visibility=0.98, phase_noise_std=0.2, rng=mzi_seed)
+        return Bob(name, env, mzi, rng=node_seed)
     else:
-        return Node(name, env)
+        return Node(name, env, rng)
 
 
-def channel_factory (a, b, length_meters, attenuation_db_per_m, depol_prob, pol_err_std=None):
+def channel_factory (a, b, length_meters, attenuation_db_per_m, depol_prob, pol_err_std=None, rng=None):
     return QuantumChannel(
         name=f"{a}_{b}",
         length_meters=length_meters,
         attenuation_db_per_m= attenuation_db_per_m,
         depol_prob=depol_prob,
-        pol_err_std=pol_err_std
+        pol_err_std=pol_err_std,
+        rng=rng
     )
-#'''
-env=simpy.Environment()
-alice=Alice("al", env, 10_00_000)
-snspd0 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12)
-snspd1 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12)
-mzi = MachZehnderInterferometer(snspd0=snspd0, snspd1=snspd1, visibility=0.98, phase_noise_std=0.2)
-bob=Bob("bob", env, mzi)
-channel=QuantumChannel(
-        name="q_chan",
-        length_meters=90_000,
-        attenuation_db_per_m= 0.0002,
-        depol_prob=0.1,
-        pol_err_std=1
-    )
-run_dps(alice, bob, channel, env, num_pulses=10_00_000)
-    
-#'''
+
+
+if __name__ == "__main__":
+    # 90 km demo run: python Protocols/DPS.py
+    env=simpy.Environment()
+    alice=Alice("al", env, 10_00_000)
+    snspd0 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12)
+    snspd1 = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12)
+    mzi = MachZehnderInterferometer(snspd0=snspd0, snspd1=snspd1, visibility=0.98, phase_noise_std=0.2)
+    bob=Bob("bob", env, mzi)
+    channel=QuantumChannel(
+            name="q_chan",
+            length_meters=90_000,
+            attenuation_db_per_m= 0.0002,
+            depol_prob=0.1,
+            pol_err_std=1
+        )
+    run_dps(alice, bob, channel, env, num_pulses=10_00_000)
@@ -9,11 +9,16 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from Hardware.node import Node
 from utils.entanglement_manage import EntanglementManager
 from utils import key_rate
+
+ALICE_ANGLES = np.array([0, np.pi/4, np.pi/2])
+BOB_ANGLES = np.array([np.pi/4, np.pi/2, 3*np.pi/4])
+CLOCK_RATE = 10e6            # 10 MHz source
+BATCH_SIZE = 2_000_000       # rounds per NumPy block in run_e91_batch
 # ————————————————
 # Helper: projective measurement of one qubit in a 2-qubit density matrix
 # along direction φ in the x–z plane
 # ————————————————
-def measure_local(rho, qubit_index, phi):
+def measure_local(rho, qubit_index, phi, rng=None):
     # Pauli matrices
     Z = np.array([[1, 0], [0, -1]], complex)
     X = np.array([[0, 1], [1, 0]], complex)
@@ -33,7 +38,7 @@ def measure_local(rho, qubit_index, phi):
         Pm_full = np.kron(I2, Pm)
 
     p_plus = np.real(np.trace(Pp_full @ rho))
-    if np.random.rand() < p_plus:
+    if (np.random if rng is None else rng).random() < p_plus:
         outcome = +1
         rho_post = (Pp_full @ rho @ Pp_full) / (p_plus + 1e-16)
     else:
@@ -49,9 +54,10 @@ class Alice(Node):
     def __init__(self, node_id, env, num_pulses,
                  p_depol=0.02,      # 2% state depolarization
                  misalign_deg=1.0,  # 1° basis misalignment
-                 p_flip=0.005       # 0.5% detector flip
+                 p_flip=0.005,      # 0.5% detector flip
+                 rng=None
                 ):
-        super().__init__(node_id, env)
+        super().__init__(node_id, env, rng)
         self.num_pulses = num_pulses
         self.p_depol     = p_depol
         self.misalign   = np.deg2rad(misalign_deg)
@@ -70,6 +76,7 @@ class Alice(Node):
             # 1) Create fresh Bell pair
             pair_id, _ = manager.create_bell_pair(self, bob, bell_type='00')
             shared_state, _, _ = manager.entangled_pairs[pair_id]
+            manager.release(pair_id)  # the round measures its own Werner state below, the pair is not needed
 
             # overwrite to |Ψ⁻> = (|01> - |10>)/√2
             psi_minus = np.array([0, 1, -1, 0], complex)/np.sqrt(2)
@@ -82,21 +89,21 @@ class Alice(Node):
 
 
             # 3) Pick random ideal angles
-            φa = np.random.choice(angles_a)
-            φb = np.random.choice(angles_b)
+            φa = self.rng.choice(angles_a)
+            φb = self.rng.choice(angles_b)
 
             # 4) Apply misalignment noise
-            φa_m = φa + np.random.normal(0, self.misalign)
-            φb_m = φb + np.random.normal(0, self.misalign)
+            φa_m = φa + self.rng.normal(0, self.misalign)
+            φb_m = φb + self.rng.normal(0, self.misalign)
 
             # 5) Measure qubit 0 (Alice) then qubit 1 (Bob)
-            sa, rho1 = measure_local(rho,      qubit_index=0, phi=φa_m)
-            sb, _    = measure_local(rho1,     qubit_index=1, phi=φb_m)
+            sa, rho1 = measure_local(rho,      qubit_index=0, phi=φa_m, rng=self.rng)
+            sb, _    = measure_local(rho1,     qubit_index=1, phi=φb_m, rng=self.rng)
 
             # 6) Detector flip errors
-            if np.random.rand() < self.p_flip:
+            if self.rng.random() < self.p_flip:
                 sa = -sa
-            if np.random.rand() < self.p_flip:
+            if self.rng.random() < self.p_flip:
                 sb = -sb
 
             # 7) Record raw data
@@ -111,8 +118,8 @@ class Alice(Node):
 # Bob only needs storage
 # ————————————————
 class Bob(Node):
-    def __init__(self, node_id, env):
-        super().__init__(node_id, env)
+    def __init__(self, node_id, env, rng=None):
+        super().__init__(node_id, env, rng)
         self.phi_list = []
         self.s_list   = []
 
@@ -129,16 +136,19 @@ def run_e91(alice, bob, channel, env, num_pulses=10000):
     # (shared angles: π/4 and π/2)
     alice_key = []
     bob_key   = []
-    for φa, φb, sa, sb in zip(alice.phi_list, bob.phi_list,
-                              alice.s_list,   bob.s_list):
-        if abs(φa - φb) < 1e-8:
-            # map ±1 → 0/1
-            ba = (sa + 1)//2
-            bb = (sb + 1)//2
-            # anticorrelation of |Ψ⁻⟩ → Bob flips
-            bb = 1 - bb
-            alice_key.append(int(ba))
-            bob_key.append(int(bb))
+    with alice.perf.stage("sifting"):
+        for φa, φb, sa, sb in zip(alice.phi_list, bob.phi_list,
+                                  alice.s_list,   bob.s_list):
+            if abs(φa - φb) < 1e-8:
+                # map ±1 → 0/1
+                ba = (sa + 1)//2
+                bb = (sb + 1)//2
+                # anticorrelation of |Ψ⁻⟩ → Bob flips
+                bb = 1 - bb
+                alice_key.append(int(ba))
+                bob_key.append(int(bb))
+    alice.perf.count("pulses_emitted", len(alice.phi_list))  # entangled pairs, E91 has no channel
+    alice.perf.count("sifted_bits", len(alice_key))
 
    
     #m = min(20, len(alice_key))
@@ -157,13 +167,89 @@ def run_e91(alice, bob, channel, env, num_pulses=10000):
     
     else:
         return None
-    
-env = simpy.Environment()       
-def node_factory(name, role, env, **kwargs):
+
+
+def run_e91_batch(alice, bob, channel, env, num_pulses=10000, batch_size=BATCH_SIZE, **kwargs):
+    """
+    Vectorized E91: all angle choices of a block are drawn at once and outcomes are sampled from the
+    analytic joint distribution of the Werner state (1-p)|Ψ⁻><Ψ⁻| + p I/4: both marginals are uniform
+    and <σ_a σ_b> = -(1-p) cos(φa - φb), so P(sa, sb) = (1 + sa sb E) / 4.
+    Sifting errors and CHSH correlations only depend on the product sa*sb, so only that is sampled;
+    misalignment and detector flips are folded into it with the same statistics as Alice.run.
+    Returns (qber, asym_key_rate) and sets alice.metrics["chsh_s"] to S, from the rounds with
+    a ∈ {0, π/2}, b ∈ {π/4, 3π/4}.
+    """
+    # angle pair k = 3 * (alice index) + (bob index)
+    nominal_diff = (ALICE_ANGLES[:, None] - BOB_ANGLES[None, :]).ravel()
+    is_key_pair = np.abs(nominal_diff) < 1e-8  # same nominal angle: π/4 or π/2
+    # the product flips when exactly one detector flips
+    q_flip = 2 * alice.p_flip * (1 - alice.p_flip)
+
+    sifted = 0
+    errors = 0
+    corr_sum = np.zeros(9)    # sum of sa*sb per (alice angle, bob angle) pair
+    corr_count = np.zeros(9)
+    for start in range(0, num_pulses, batch_size):
+        n = min(batch_size, num_pulses - start)
+
+        # --- Angle choices; both misalignments together shift φa - φb by N(0, 2σ²) ---
+        pair = alice.rng.integers(0, 9, n)
+        diff = nominal_diff[pair] + alice.rng.normal(0, np.sqrt(2) * alice.misalign, n)
+
+        # --- Outcome product sa*sb from the joint distribution, with detector flips ---
+        E = -(1 - alice.p_depol) * (1 - 2 * q_flip) * np.cos(diff)
+        same = alice.rng.random(n) < (1 + E) / 2  # sa == sb
+
+        # --- Sift: Bob flips his bit for the anticorrelated |Ψ⁻⟩, so sa == sb is an error ---
+        key = is_key_pair[pair]
+        sifted += int(np.count_nonzero(key))
+        errors += int(np.count_nonzero(same & key))
+
+        counts = np.bincount(pair, minlength=9)
+        corr_sum += 2 * np.bincount(pair, weights=same, minlength=9) - counts
+        corr_count += counts
+
+    alice.perf.count("pulses_emitted", num_pulses)  # entangled pairs, E91 has no channel
+    alice.perf.count("sifted_bits", sifted)
+
+    corr = np.divide(corr_sum, corr_count, out=np.zeros(9), where=corr_count > 0).reshape(3, 3)
+    chsh_s = corr[0, 0] - corr[0, 2] + corr[2, 0] + corr[2, 2]
+    alice.metrics["chsh_s"] = round(float(chsh_s), 4)
+
+    if not sifted:
+        return None, None
+    qber = errors / sifted
+    sim_time = num_pulses / CLOCK_RATE
+    sifted_key_rate = sifted / sim_time
+    asym_key_rate = key_rate.compute_key_rate(qber, sifted_key_rate)
+    return qber, asym_key_rate
+
+
+def estimate_e91(alice, bob, channel, env, num_pulses=10000, **kwargs):
+    """
+    Closed-form estimate of run_e91_batch: the expected correlation of each angle pair is
+    -(1-p)(1-2 q_flip) exp(-σ²) cos(φa - φb), the Gaussian misalignment of both sides averaged out.
+    Returns (qber, asym_key_rate) and sets alice.metrics["chsh_s"], all expected values.
+    """
+    q_flip = 2 * alice.p_flip * (1 - alice.p_flip)
+    contrast = (1 - alice.p_depol) * (1 - 2 * q_flip) * np.exp(-alice.misalign ** 2)
+    corr = -contrast * np.cos(ALICE_ANGLES[:, None] - BOB_ANGLES[None, :])
+    chsh_s = corr[0, 0] - corr[0, 2] + corr[2, 0] + corr[2, 2]
+
+    qber = (1 - contrast) / 2  # key pairs have φa = φb: an error when sa == sb
+    key_pairs = np.count_nonzero(np.abs(ALICE_ANGLES[:, None] - BOB_ANGLES[None, :]) < 1e-8)
+    sifted = num_pulses * key_pairs / 9
+    sim_time = num_pulses / CLOCK_RATE
+    asym_key_rate = key_rate.compute_key_rate(qber, sifted / sim_time)
+    alice.metrics["chsh_s"] = round(float(chsh_s), 4)
+    return qber, asym_key_rate
+
+
+def node_factory(name, role, env, rng=None, **kwargs):
     if role == "Sender":
-        return Alice(name, env, num_pulses=kwargs.get("num_pulses", 10000), p_depol=kwargs.get("p_depol", 0.03), misalign_deg=kwargs.get("misalign_deg", 1.5), p_flip=kwargs.get("p_flip", 0.01))
+        return Alice(name, env, num_pulses=kwargs.get("num_pulses", 10000), p_depol=kwargs.get("p_depol", 0.03), misalign_deg=kwargs.get("misalign_deg", 1.5), p_flip=kwargs.get("p_flip", 0.01), rng=rng)
     elif role == "Receiver":
         
-        return Bob(name, env)
+        return Bob(name, env, rng=rng)
     else:
-        return Node(name, env)
\ No newline at end of file
+        return Node(name, env, rng)
\ No newline at end of file
@@ -1,3 +1,20 @@
+import inspect
+
+from Hardware.rng import spawn
+from utils.perf import NULL_PERF, PerfRecorder, instrument_link
+
+
+def rng_kwargs(factory, seed):
+    """{"rng": seed} if the factory takes an rng keyword (or **kwargs), else {}: older factories draw from their own stream."""
+    try:
+        params = inspect.signature(factory).parameters.values()
+    except (TypeError, ValueError):  # no introspectable signature, e.g. some builtins
+        return {"rng": seed}
+    if any(p.name == "rng" or p.kind is inspect.Parameter.VAR_KEYWORD for p in params):
+        return {"rng": seed}
+    return {}
+
+
 class ProtocolHandler:
     def __init__(self, protocol_name, node_factory, channel_factory, run_function):
         self.protocol_name = protocol_name
@@ -6,6 +23,8 @@ class ProtocolHandler:
         self.run_function = run_function
         self.qber=None
         self.asym_key_rate=None 
+        self.metrics = {}  # protocol-specific extras the nodes report, e.g. {"chsh_s": ...} from E91
+        self.perf = NULL_PERF
         self.node_objs = {} 
 
     def run(self, config):
@@ -21,28 +40,45 @@ class ProtocolHandler:
                 "endpoints": ("Alice", "Bob"),
                 "args": {...}
             },
-            "protocol_args": {...}
+            "protocol_args": {...},
+            "log_policy": {"policy": "last", "size": 1},  # optional, see Hardware.node.make_log
+            "seed": 1234,                                 # optional int / SeedSequence, see Hardware.rng
+            "perf": True                                  # optional, per-stage timing and counters in self.perf
         }
+        Every node and the channel get their own child of the seed's SeedSequence, so a seeded run
+        is reproducible and independent of any other run in the same process. The child is passed as
+        rng=... to factories that accept it; a factory without an rng parameter is called as before.
         """
         env = config["env"]
         #node_objs = {}
+        perf = self.perf = PerfRecorder() if config.get("perf") else NULL_PERF
+        with perf.stage("setup"):
+            seeds = spawn(config.get("seed"), len(config["nodes"]) + 1)  # one per node, the last for the channel
         
-        for node_id, node_info in config["nodes"].items():
-            role = node_info["role"]
-            args = node_info["args"]
-            self.node_objs[node_id] = self.node_factory(node_id, role, env, **args)
-        node_names = list(config["nodes"].keys())
-        a, b = node_names[0], node_names[1]
-        channel=None
-        if self.channel_factory is not None and "channel" in config:
-            a, b = config["channel"]["endpoints"]
-            channel_args = config["channel"]["args"]
-            channel = self.channel_factory(a, b, **channel_args)
+            for (node_id, node_info), seed in zip(config["nodes"].items(), seeds):
+                role = node_info["role"]
+                args = node_info["args"]
+                self.node_objs[node_id] = self.node_factory(node_id, role, env, **rng_kwargs(self.node_factory, seed), **args)
+                if "log_policy" in config:
+                    self.node_objs[node_id].set_log_policy(**config["log_policy"])
+            node_names = list(config["nodes"].keys())
+            a, b = node_names[0], node_names[1]
+            channel=None
+            if self.channel_factory is not None and "channel" in config:
+                a, b = config["channel"]["endpoints"]
+                channel_args = config["channel"]["args"]
+                channel = self.channel_factory(a, b, **rng_kwargs(self.channel_factory, seeds[-1]), **channel_args)
+        if perf.enabled:
+            instrument_link(perf, env, self.node_objs.values(), channel)
 
 
         
 
        # self.run_function(node_objs[a], node_objs[b], channel, env, **config.get("protocol_args", {}))
-        self.qber, self.asym_key_rate = self.run_function(
-            self.node_objs[a], self.node_objs[b], channel, env, **config.get("protocol_args", {})
-        )
+        with perf.stage("run"):
+            result = self.run_function(
+                self.node_objs[a], self.node_objs[b], channel, env, **config.get("protocol_args", {})
+            )
+        # run functions return (qber, asym_key_rate), or None; anything else they report is in node.metrics
+        self.qber, self.asym_key_rate = result if result is not None else (None, None)
+        self.metrics = {key: value for node in self.node_objs.values() for key, value in node.metrics.items()}
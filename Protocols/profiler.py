@@ -0,0 +1,232 @@
+'''Offline profiler for one protocol link: hot functions, flamegraph stacks and memory by source line.
+
+Usage (from the repository root):
+    python -m Protocols.profiler --protocol DPS --distance 10000 --param num_pulses=100000 --out profile_dps
+
+The link is built exactly as the server builds it (app.link_params, app.simulate_link), with grid-style
+overrides as in utils/sweep.py. Writes to --out:
+    stacks.folded   one "frame;frame;frame count" line per sampled stack, for flamegraph.pl or speedscope
+    profile.prof    cProfile statistics (--profiler cprofile), for pstats / snakeviz
+    report.json     result, wall time, top functions, self time per package and memory by line
+'''
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+SAMPLE_INTERVAL_S = 0.001  # stack sampling period
+MEMORY_POLL_S = 0.05       # how often the sampler checks for a new tracemalloc peak
+PEAK_GROWTH = 1.05         # a new snapshot is taken when traced memory exceeds the last one by 5%
+
+
+def short_path(filename):
+    return os.path.relpath(filename, ROOT) if filename.startswith(ROOT) else filename
+
+
+def frame_label(code):
+    return f"{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})"
+
+
+def package_of(filename):
+    """Coarse area of a source file: a repository directory (Hardware, Protocols, ...) or an installed package."""
+    if filename.startswith(ROOT):
+        parts = os.path.relpath(filename, ROOT).split(os.sep)
+        return parts[0] if len(parts) > 1 else parts[0].rsplit(".", 1)[0]
+    if "site-packages" in filename:
+        return filename.split("site-packages" + os.sep, 1)[1].split(os.sep)[0]
+    if filename.startswith("<") or filename == "~":
+        return "builtins"
+    return "stdlib"
+
+
+class StackSampler(threading.Thread):
+    '''Samples the stack of one thread every interval; also snapshots tracemalloc near its peak.'''
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL_S, track_memory=False):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.track_memory = track_memory
+        self.stacks = Counter()  # tuple of frame codes, root first: samples
+        self.peak_snapshot = None
+        self.peak_bytes = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        next_poll = 0.0
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+            if self.track_memory and time.perf_counter() >= next_poll:
+                next_poll = time.perf_counter() + MEMORY_POLL_S
+                self.check_memory()
+
+    def check_memory(self):
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.peak_bytes * PEAK_GROWTH:
+            self.peak_bytes = current
+            self.peak_snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def folded(self):
+        """Stacks in the folded format of flamegraph.pl: 'root;...;leaf count' per line."""
+        return "".join(";".join(frame_label(c) for c in stack) + f" {n}\n" for stack, n in self.stacks.most_common())
+
+    def top(self, n):
+        """Hottest functions by samples: self (leaf) and total (anywhere on the stack)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for code in set(stack):
+                total[code] += count
+        samples = sum(self.stacks.values()) or 1
+        return [{"function": frame_label(code), "self_pct": round(100 * count / samples, 2),
+                 "total_pct": round(100 * total[code] / samples, 2), "self_samples": count}
+                for code, count in own.most_common(n)]
+
+    def by_package(self):
+        own = Counter()
+        for stack, count in self.stacks.items():
+            own[package_of(stack[-1].co_filename)] += count
+        samples = sum(own.values()) or 1
+        return {package: round(100 * count / samples, 2) for package, count in own.most_common()}
+
+
+def cprofile_top(profile, n):
+    stats = pstats.Stats(profile)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:n]  # by own time
+    return [{"function": f"{name} ({short_path(filename)}:{line})",
+             "calls": nc, "self_s": round(tt, 6), "total_s": round(ct, 6)}
+            for (filename, line, name), (cc, nc, tt, ct, callers) in rows]
+
+
+def cprofile_by_package(profile):
+    own = Counter()
+    for (filename, _, _), (_, _, tt, _, _) in pstats.Stats(profile).stats.items():
+        own[package_of(filename)] += tt
+    total = sum(own.values()) or 1
+    return {package: round(100 * t / total, 2) for package, t in own.most_common()}
+
+
+def memory_by_line(snapshot, n):
+    return [{"line": f"{short_path(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+             "size_kib": round(s.size / 1024, 1), "count": s.count}
+            for s in snapshot.statistics("lineno")[:n]]
+
+
+def profile_link(point, seed=0, profiler="sample", memory=True, top=25, out=None):
+    """
+    Runs one link (a sweep-style point: protocol, distance and overrides) under the profiler and
+    returns the report dict; with out, also writes the files listed in the module docstring.
+    """
+    from app import simulate_link
+    from utils.sweep import point_params
+
+    params = point_params(point)
+    if memory:
+        tracemalloc.start()
+    sampler = StackSampler(threading.get_ident(), track_memory=memory)
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(SAMPLE_INTERVAL_S / 2)  # let the sampler thread run on time
+    profile = cProfile.Profile() if profiler == "cprofile" else None
+
+    sampler.start()
+    started = time.perf_counter()
+    try:
+        if profile:
+            profile.enable()
+        result = simulate_link("Alice", "Bob", params, seed)
+    finally:
+        if profile:
+            profile.disable()
+        wall = time.perf_counter() - started
+        sampler.stop()
+        sys.setswitchinterval(switch_interval)
+
+    report = {"point": point, "params": params, "seed": seed, "profiler": profiler, "wall_s": round(wall, 4),
+              "qber": result["qber"], "key_rate": result["key_rate"], "samples": sum(sampler.stacks.values())}
+    if profile:
+        report["top_functions"] = cprofile_top(profile, top)
+        report["self_time_by_package_pct"] = cprofile_by_package(profile)
+    else:
+        report["top_functions"] = sampler.top(top)
+        report["self_time_by_package_pct"] = sampler.by_package()
+    if memory:
+        sampler.check_memory()  # memory still held at the end of the run
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        report["peak_memory_mib"] = round(peak / 2**20, 2)
+        report["peak_memory_by_line"] = memory_by_line(sampler.peak_snapshot, top) if sampler.peak_snapshot else []
+
+    if out:
+        os.makedirs(out, exist_ok=True)
+        with open(os.path.join(out, "stacks.folded"), "w") as f:
+            f.write(sampler.folded())
+        if profile:
+            profile.dump_stats(os.path.join(out, "profile.prof"))
+        with open(os.path.join(out, "report.json"), "w") as f:
+            json.dump(report, f, indent=2, default=str)
+    return report
+
+
+def print_report(report, file=sys.stdout):
+    print(f"{report['point']}  wall {report['wall_s']} s  qber {report['qber']}  key rate {report['key_rate']}", file=file)
+    print("\nSelf time by package (%):", file=file)
+    for package, pct in report["self_time_by_package_pct"].items():
+        print(f"  {pct:6.2f}  {package}", file=file)
+    print("\nTop functions:", file=file)
+    for row in report["top_functions"]:
+        cost = f"{row['self_s']:9.4f} s {row['calls']:>9} calls" if "self_s" in row else f"{row['self_pct']:6.2f}% self {row['total_pct']:6.2f}% total"
+        print(f"  {cost}  {row['function']}", file=file)
+    if "peak_memory_mib" in report:
+        print(f"\nPeak traced memory: {report['peak_memory_mib']} MiB, by line:", file=file)
+        for row in report["peak_memory_by_line"]:
+            print(f"  {row['size_kib']:10.1f} KiB {row['count']:>9}  {row['line']}", file=file)
+
+
+def main(argv=None):
+    from app import protocols
+    from utils.sweep import parse_values
+
+    parser = argparse.ArgumentParser(description="Profile one protocol link: hot functions, flamegraph stacks, memory by line.")
+    parser.add_argument("--protocol", required=True, choices=sorted(protocols))
+    parser.add_argument("--distance", type=float, default=1000, help="metres")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                        help="channel / sender / protocol argument, e.g. num_pulses=100000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profiler", choices=["sample", "cprofile"], default="sample",
+                        help="sampling (low overhead) or cProfile (exact call counts, slower run)")
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc, which slows the run down")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--out", default="profile", help="directory for stacks.folded, profile.prof and report.json")
+    args = parser.parse_args(argv)
+
+    point = {"protocol": args.protocol, "distance": args.distance}
+    for spec in args.param:
+        name, _, value = spec.partition("=")
+        point[name] = parse_values(value)[0]
+
+    report = profile_link(point, seed=args.seed, profiler=args.profiler, memory=not args.no_memory,
+                          top=args.top, out=args.out)
+    print_report(report)
+    print(f"\nWritten to {args.out}/", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
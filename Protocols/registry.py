@@ -0,0 +1,117 @@
+'''Protocol registry: protocol name -> factories and run/estimate functions, imported on first use.
+
+Built-in protocols are listed below as "module:attribute" references. Other packages can add
+protocols through the ENTRY_POINT_GROUP entry point group, e.g. in their pyproject.toml:
+
+    [project.entry-points."qkd_simulator.protocols"]
+    MDI = "my_package.mdi:PROTOCOL"
+
+where PROTOCOL is a dict with the same keys as the entries of BUILTIN_PROTOCOLS (references may be
+"module:attribute" strings or the objects themselves). The factories are called as
+
+    node_factory(name, role, env, rng=..., **sender_args)
+    channel_factory(node_a, node_b, rng=..., **channel_args)
+
+where rng is the node's / channel's seed (see Hardware.rng.make_rng); it is only passed to factories
+whose signature has an rng parameter or **kwargs, so results of factories without one are not seeded. The optional "num_pulses" overrides the pulse
+count app.py gives both the sender and the run function, and "protocol_args" adds run function
+arguments. Nothing is imported until a protocol is looked up.
+'''
+import importlib
+from collections.abc import Mapping
+from importlib.metadata import entry_points
+
+ENTRY_POINT_GROUP = "qkd_simulator.protocols"
+REFERENCE_KEYS = ("node_factory", "channel_factory", "run_function", "estimate_function")
+
+BUILTIN_PROTOCOLS = {
+    "DPS": {
+        "node_factory": "Protocols.DPS:node_factory",
+        "channel_factory": "Protocols.DPS:channel_factory",
+        "run_function": "Protocols.DPS:run_dps_batch",  # NumPy engine; run_dps is the per-pulse SimPy version
+        "estimate_function": "Protocols.DPS:estimate_dps",  # closed-form QBER / key rate, same signature as run_function
+    },
+    "COW": {
+        "node_factory": "Protocols.COW:node_factory",
+        "channel_factory": "Protocols.COW:channel_factory",
+        "run_function": "Protocols.COW:run_cow",
+        "estimate_function": "Protocols.COW:estimate_cow",
+        "num_pulses": 100_000,  # per-pulse SimPy engine; app.NUM_PULSES otherwise
+    },
+    "BB84": {
+        "node_factory": "Protocols.BB84:node_factory",
+        "channel_factory": "Protocols.BB84:channel_factory",
+        "run_function": "Protocols.BB84:run_bb84_batch",  # NumPy engine; run_bb84 is the per-pulse SimPy version
+        "estimate_function": "Protocols.BB84:estimate_bb84",
+    },
+    "E91": {
+        "node_factory": "Protocols.E91:node_factory",
+        "channel_factory": None,      # No physical channel needed, free space
+        "run_function": "Protocols.E91:run_e91_batch",  # no SimPy timing in E91, the batch sampler has the same statistics
+        "estimate_function": "Protocols.E91:estimate_e91",
+    },
+}
+
+
+def resolve(reference):
+    """Object named by a "module:attribute" string; anything else is returned as is."""
+    if not isinstance(reference, str):
+        return reference
+    module_name, _, attribute = reference.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+class ProtocolRegistry(Mapping):
+    '''Read-only mapping of protocol name to its spec dict, with the references resolved.
+    Names are known up front (built-ins plus entry points); a protocol's module is imported the
+    first time its spec is looked up, and the resolved spec is kept for later lookups.
+    Built-in names take precedence over entry points of the same name.'''
+    def __init__(self, specs=None, group=ENTRY_POINT_GROUP):
+        self.specs = dict(BUILTIN_PROTOCOLS if specs is None else specs)
+        self.group = group
+        self.loaded = {}  # name: resolved spec
+        self._discovered = group is None
+
+    def register(self, name, spec):
+        """Adds or replaces a protocol; spec is a dict like the BUILTIN_PROTOCOLS entries."""
+        self.specs[name] = spec
+        self.loaded.pop(name, None)
+
+    def has_channel(self, name):
+        """Whether the protocol simulates a physical channel, answered without importing it when possible."""
+        spec = self._spec(name)
+        return spec.get("channel_factory") is not None
+
+    def __getitem__(self, name):
+        if name not in self.loaded:
+            spec = self._spec(name)
+            self.loaded[name] = {key: resolve(value) if key in REFERENCE_KEYS else value
+                                 for key, value in spec.items()}
+        return self.loaded[name]
+
+    def __contains__(self, name):
+        self._discover()
+        return name in self.specs
+
+    def __iter__(self):
+        self._discover()
+        return iter(self.specs)
+
+    def __len__(self):
+        self._discover()
+        return len(self.specs)
+
+    def _spec(self, name):
+        self._discover()
+        spec = self.specs[name]
+        if not isinstance(spec, dict):  # entry point, loaded on first use
+            spec = self.specs[name] = spec.load()
+        return spec
+
+    def _discover(self):
+        # entry point metadata is only scanned once, the first time names are needed
+        if self._discovered:
+            return
+        self._discovered = True
+        for entry_point in entry_points(group=self.group):
+            self.specs.setdefault(entry_point.name, entry_point)
@@ -1,139 +1,516 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import simpy
 from Topology.topology import StarTopology
-from Protocols.DPS import node_factory as dps_node_factory, channel_factory as dps_channel_factory, run_dps
-from Protocols.COW import node_factory as cow_node_factory, channel_factory as cow_channel_factory, run_cow
-from Protocols.BB84 import node_factory as bb84_node_factory, channel_factory as bb84_channel_factory, run_bb84
 from Protocols.ProtocolHandler import ProtocolHandler
-from Protocols.E91 import node_factory as e91_node_factory, run_e91
-import multiprocessing
+from Protocols.registry import ProtocolRegistry
+from utils.jobs import JobStore, payload_key
+from utils.result_cache import ResultCache, config_key
+from utils.perf import PerfTotals
+import json
+import os
+import threading
+import time
+import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError, as_completed, wait
+from functools import partial
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
 # --- Protocol Registry ---
-protocols = {
-    "DPS": {
-        "node_factory": dps_node_factory,
-        "channel_factory": dps_channel_factory,
-        "run_function": run_dps,
-    },
-    "COW": {
-        "node_factory": cow_node_factory,
-        "channel_factory": cow_channel_factory,
-        "run_function": run_cow,
-    },
-    "BB84": {
-        "node_factory": bb84_node_factory,
-        "channel_factory": bb84_channel_factory,
-        "run_function": run_bb84,
-    },
-    "E91": {
-        "node_factory": e91_node_factory,
-        "channel_factory": None,      # No physical channel needed, free space
-        "run_function": run_e91,
-    }
-}
+# Built-in protocols plus any installed through the "qkd_simulator.protocols" entry point group.
+# A protocol's module is only imported the first time it is used, so importing app stays cheap.
+protocols = ProtocolRegistry()
 
-#was planning to paralleise running a protocol on each link using python's built in libs
-@app.route("/simulate", methods=["POST"])
-def simulate():
-    data = request.get_json()
+NUM_PULSES = 10_00_000    # pulses per link, unless the protocol's registry entry sets its own "num_pulses"
+LINK_TIMEOUT_S = 600      # wall-clock budget for a whole /simulate request (links run in parallel)
+MAX_WORKERS = os.cpu_count() or 1
+MAX_STORED_JOBS = 100     # finished jobs kept for polling / re-use before the oldest are evicted
+RESULT_CACHE_SIZE = 1024  # link results kept in memory
+RESULT_CACHE_DIR = None   # set to a directory to also persist link results across restarts
+APP_STARTUP_BUDGET_S = 1.0     # import of app.py, checked by utils/startup_time.py
+WORKER_STARTUP_BUDGET_S = 1.0  # fresh worker process until it has every protocol loaded
 
-    cities = data["cities"]              # List of city/node names
-    topology = data["topology"]          # "Star", "Ring", or "Mesh"
-    edges = data["edges"]                # List of [cityA, cityB]
-    protocols_per_edge = data["protocols"]  # Dict { "cityA-cityB": "DPS" }
+_executor = None
+_executor_lock = threading.Lock()
+_pool_of = {}  # future of a running / queued link: the executor it was submitted to
+_pool_of_lock = threading.Lock()  # _pool_of is written by request threads and the pools' callback threads
+job_store = JobStore(max_jobs=MAX_STORED_JOBS)
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, path=RESULT_CACHE_DIR)
+perf_totals = PerfTotals()  # perf blocks of finished links, served by /metrics
 
-    results = []
 
-    for edge in edges:
-        node_a, node_b = edge["nodes"]
-        distance = edge["distance"]
-        protocol_name = protocols_per_edge.get(f"{node_a}-{node_b}") or protocols_per_edge.get(f"{node_b}-{node_a}")
-        if protocol_name not in protocols:
-            return jsonify({"error": f"Unsupported protocol: {protocol_name}"}), 400
-
-        # Setup handler
-        proto = protocols[protocol_name]
-        handler = ProtocolHandler(protocol_name, proto["node_factory"], proto["channel_factory"], proto["run_function"])
-
-        # SimPy env and config
-        env = simpy.Environment()
-
-        config = {
-            "env": env,
-            "nodes": {
-                node_a: {"role": "Sender", "args": {"num_pulses":  10000}},
-                node_b: {"role": "Receiver", "args": {}}
-            },
-            "channel": {
-                "endpoints": (node_a, node_b),
-                "args": {"length_meters": 1, "attenuation_db_per_m": 0.0002, "depol_prob": 0.1, "pol_err_std": 1.0}
-            },
-            "protocol_args": {"num_pulses":  10_00_000}
+def get_executor():
+    """Process pool shared by all requests, created on first use so workers are only forked once."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _executor
+
+
+def submit_link(*args, **kwargs):
+    """simulate_link on the process pool; the future is tracked until done so abandon_links can find its pool."""
+    executor = get_executor()
+    future = executor.submit(simulate_link, *args, **kwargs)
+    with _pool_of_lock:
+        _pool_of[future] = executor
+    future.add_done_callback(untrack_link)
+    return future
+
+
+def untrack_link(future):
+    with _pool_of_lock:
+        _pool_of.pop(future, None)
+
+
+def abandon_links(futures):
+    """
+    Gives up on links past their deadline. Queued links are cancelled. A link already running cannot
+    be cancelled, and it would keep its worker busy indefinitely. So its pool is retired: later links
+    go to a fresh pool, and the old pool is shut down once its other links have finished (they get
+    at most LINK_TIMEOUT_S more). The stuck worker takes no new links and exits when its link returns.
+    """
+    stuck = [f for f in futures if not f.cancel() and not f.done()]
+    with _pool_of_lock:
+        pools = {_pool_of.get(f) for f in stuck} - {None}
+    for executor in pools:
+        retire_executor(executor, stuck)
+
+
+def retire_executor(executor, stuck=()):
+    global _executor
+    with _executor_lock:
+        if _executor is not executor:
+            return  # already retired by another request
+        _executor = None
+    with _pool_of_lock:
+        others = [f for f, pool in _pool_of.items() if pool is executor and f not in stuck]
+
+    def reap():
+        wait(others, timeout=LINK_TIMEOUT_S)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    threading.Thread(target=reap, daemon=True).start()
+
+
+def link_params(distance, protocol_name):
+    """Everything that determines a link's simulation apart from the node names and the seed."""
+    has_channel = protocols.has_channel(protocol_name)
+    spec = protocols[protocol_name]
+    num_pulses = spec.get("num_pulses", NUM_PULSES)  # one count for the sender and the run function
+    return {
+        "protocol": protocol_name,
+        "sender_args": {"num_pulses": num_pulses},
+        # protocols without a physical channel (free space) get a dummy 1 m channel
+        "channel_args": {"length_meters": distance if has_channel else 1, "attenuation_db_per_m": 0.0002, "depol_prob": 0.1, "pol_err_std": 1.0},
+        "protocol_args": {"num_pulses": num_pulses, **spec.get("protocol_args", {})},
+    }
+
+
+def hardware_stats_for(params):
+    channel_args = params["channel_args"]
+    if protocols.has_channel(params["protocol"]):
+        return {
+            "distance_m": channel_args["length_meters"],
+            "attenuation_db_per_m": channel_args["attenuation_db_per_m"],
+            "depol_prob": channel_args["depol_prob"],
+            "pol_err_std": channel_args["pol_err_std"],
+            "pulse_wavelength_nm": 1550,  # example: 1550nm typical telecom wavelength
+            "num_pulses": params["protocol_args"]["num_pulses"],
         }
-        if proto.get("channel_factory"):
-            config["channel"] = {
-                "endpoints": (node_a, node_b),
-                "args": {
-                    "length_meters": distance,
-                    "attenuation_db_per_m": 0.0002,
-                    "depol_prob": 0.1,
-                    "pol_err_std": 1.0
-                }
-            }
-            hardware_stats = {
-            "distance_m": distance,
-            "attenuation_db_per_m": config["channel"]["args"]["attenuation_db_per_m"],
-            "depol_prob": config["channel"]["args"]["depol_prob"],
-            "pol_err_std": config["channel"]["args"]["pol_err_std"],
-            "pulse_wavelength_nm": 1550  # example: 1550nm typical telecom wavelength
-            }
-        else:
-            hardware_stats = {
-            "distance_m": "Free Space",
-            "attenuation_db_per_m": "N/A",
-            "depol_prob": "N/A",
-            "pol_err_std": "N/A",
-            "pulse_wavelength_nm": "N/A"
+    return {
+        "distance_m": "Free Space",
+        "attenuation_db_per_m": "N/A",
+        "depol_prob": "N/A",
+        "pol_err_std": "N/A",
+        "pulse_wavelength_nm": "N/A",
+        "num_pulses": params["protocol_args"]["num_pulses"],
     }
-            
-            
 
-        handler.run(config)
 
-        qber = handler.qber
-        asym_key_rate=handler.asym_key_rate
-        
-        result = {
+def load_protocols(names=None):
+    """
+    Imports the given protocols (all by default) in this process and returns the seconds it took.
+    Submitted to a fresh worker by utils/startup_time.py to measure worker startup.
+    """
+    started = time.perf_counter()
+    for name in (names if names is not None else list(protocols)):
+        protocols[name]
+    return time.perf_counter() - started
+
+
+def simulate_link(node_a, node_b, params, seed, mode="simulate", perf=False):
+    """
+    Runs one edge of the topology in its own SimPy environment and returns its result dict.
+    Executed in a worker process, so everything it needs is passed in; the seed roots the link's
+    random streams (ProtocolHandler spawns one per node and channel).
+    With mode="estimate" the protocol's closed-form estimate_function runs instead of the Monte Carlo.
+    With perf=True the result has a "perf" block: wall time per stage and event counters (utils/perf.py).
+    """
+
+    # Setup handler
+    protocol_name = params["protocol"]
+    proto = protocols[protocol_name]
+    run_function = proto["estimate_function"] if mode == "estimate" else proto["run_function"]
+    handler = ProtocolHandler(protocol_name, proto["node_factory"], proto["channel_factory"], run_function)
+
+    # SimPy env and config
+    env = simpy.Environment()
+    config = {
+        "env": env,
+        "nodes": {
+            node_a: {"role": "Sender", "args": dict(params["sender_args"])},
+            node_b: {"role": "Receiver", "args": {}}
+        },
+        "channel": {
+            "endpoints": (node_a, node_b),
+            "args": dict(params["channel_args"])
+        },
+        "protocol_args": dict(params["protocol_args"]),
+        "log_policy": {"policy": "last", "size": 1},  # only the last sent/received times are reported
+        "seed": seed,
+        "perf": perf,
+    }
+
+    handler.run(config)
+
+    qber = handler.qber
+    asym_key_rate=handler.asym_key_rate
+
+    result = {
         "protocol": protocol_name,
         "link": f"{node_a} <--> {node_b}",
         "qber": round(qber, 4) if qber is not None else None,
         "key_rate": round(asym_key_rate, 4) if asym_key_rate is not None else 0.0,
         "nodes": {},
-        "hardware_stats": hardware_stats
-}
+        "hardware_stats": hardware_stats_for(params),
+        "metrics": handler.metrics,  # protocol-specific extras, e.g. E91's CHSH "chsh_s"
+        "mode": mode,
+    }
+    if perf:
+        result["perf"] = handler.perf.as_dict()
+
+    for node_name in [node_a, node_b]:
+        node = handler.node_objs.get(node_name)
+        if not node:
+            continue
+
+        # batch engines write no per-pulse log and set the times on the node instead
+        last_sent = node.last_sent_time if node.last_sent_time is not None else (node.sent_log[-1][0] if node.sent_log else None)
+        last_recv = node.last_recv_time if node.last_recv_time is not None else (node.recv_log[-1][0] if node.recv_log else None)
+
+        result["nodes"][node_name] = {
+            "last_sent_time": f"{last_sent:.2e}" if last_sent is not None else None,
+            "last_recv_time": f"{last_recv:.2e}" if last_recv is not None else None,
+        }
+
+    return result
+
+
+def estimate_links(links, perf=False):
+    """Closed-form results for every link, computed in the request thread (microseconds per link)."""
+    results = []
+    for link in links:
+        node_a, node_b, distance, protocol_name = link
+        try:
+            results.append(simulate_link(node_a, node_b, link_params(distance, protocol_name), None, mode="estimate", perf=perf))
+            if perf:
+                record_link_perf(results[-1])
+        except Exception as e:
+            app.logger.exception("Estimate for %s <--> %s failed", node_a, node_b)
+            results.append(failed_link_result(*link, error=f"{type(e).__name__}: {e}"))
+    return results
+
+
+def failed_link_result(node_a, node_b, distance, protocol_name, error):
+    """Result row for a link whose worker raised or timed out; same shape as simulate_link's, plus 'error'."""
+    return {
+        "protocol": protocol_name,
+        "link": f"{node_a} <--> {node_b}",
+        "qber": None,
+        "key_rate": 0.0,
+        "nodes": {},
+        "hardware_stats": hardware_stats_for(link_params(distance, protocol_name)),
+        "error": error,
+    }
+
+
+# --- Result cache: node names are replaced by roles so A-B, B-A and renamed links share entries ---
+def result_by_role(result, node_a, node_b):
+    """A link result with its node names replaced by roles, so it can stand for any link with the same config."""
+    nodes = result["nodes"]
+    roles = {role: nodes[name] for role, name in (("Sender", node_a), ("Receiver", node_b)) if name in nodes}
+    return {**result, "link": None, "nodes": roles}
 
 
-        for node_name in [node_a, node_b]:
-            node = handler.node_objs.get(node_name)
-            if not node:
-                continue
+def cache_link_result(key, node_a, node_b, future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    result_cache.put(key, result_by_role(future.result(), node_a, node_b))
 
-            last_sent = node.sent_log[-1][0] if node.sent_log else None
-            last_recv = node.recv_log[-1][0] if node.recv_log else None
 
-            result["nodes"][node_name] = {
-                "last_sent_time": f"{last_sent:.2e}" if last_sent is not None else None,
-                "last_recv_time": f"{last_recv:.2e}" if last_recv is not None else None,
-            }
+def cached_link_result(cached, node_a, node_b):
+    nodes = cached["nodes"]
+    names = {role: name for role, name in (("Sender", node_a), ("Receiver", node_b)) if role in nodes}
+    return {**cached, "link": f"{node_a} <--> {node_b}", "nodes": {name: nodes[role] for role, name in names.items()}}
 
-        results.append(result)
+
+def shared_link_future(primary, primary_nodes, node_a, node_b):
+    """Future for a link with the same config as primary's: its result, under this link's node names."""
+    future = Future()
+
+    def relay(done):
+        if future.cancelled():
+            return
+        if done.cancelled():
+            future.cancel()
+        elif done.exception() is not None:
+            future.set_exception(done.exception())
+        else:
+            future.set_result(cached_link_result(result_by_role(done.result(), *primary_nodes), node_a, node_b))
+
+    primary.add_done_callback(relay)
+    return future
+
+
+def record_link_perf(result):
+    if "perf" in result:
+        perf_totals.add(result["protocol"], result["perf"])
+
+
+def collect_link_perf(future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    record_link_perf(future.result())
+
+
+def link_seed(seed, key):
+    """Seed for one link: fixed by (request seed, link config) when a seed is given, fresh entropy otherwise."""
+    if seed is None:
+        return int(np.random.SeedSequence().generate_state(1)[0])
+    return int(np.random.SeedSequence([seed, int(key[:16], 16)]).generate_state(1)[0])
+
+
+def parse_links(data):
+    """
+    Turns a /simulate payload into a list of (node_a, node_b, distance, protocol_name) jobs.
+    Raises ValueError for an edge without a supported protocol or with a distance that is not a
+    non-negative number of metres.
+    """
+    edges = data["edges"]                # List of [cityA, cityB]
+    protocols_per_edge = data["protocols"]  # Dict { "cityA-cityB": "DPS" }
+
+    links = []
+    for edge in edges:
+        node_a, node_b = edge["nodes"]
+        distance = edge["distance"]
+        if isinstance(distance, bool) or not isinstance(distance, (int, float)) or not 0 <= distance < float("inf"):
+            raise ValueError(f"Invalid distance for {node_a}-{node_b}: {distance!r}")
+        protocol_name = protocols_per_edge.get(f"{node_a}-{node_b}") or protocols_per_edge.get(f"{node_b}-{node_a}")
+        if protocol_name not in protocols:
+            raise ValueError(f"Unsupported protocol: {protocol_name}")
+        links.append((node_a, node_b, distance, protocol_name))
+    return links
+
+
+def submit_links(links, seed=None, perf=False):
+    """
+    Fans the links out to the process pool and returns one future per link. With a seed, links whose
+    config (protocol, channel, pulse counts and seed) is already in result_cache come back as completed
+    futures, and links of one request with the same config share a single simulation. Unseeded links
+    are independent draws, so each is simulated and none is cached.
+    With perf=True every link is simulated with instrumentation, bypassing the cache (timings are not reusable).
+    """
+    futures = []
+    submitted = {}  # key: (future, (node_a, node_b)) of the first link with that config in this request
+    for node_a, node_b, distance, protocol_name in links:
+        params = link_params(distance, protocol_name)
+        key = config_key({**params, "seed": seed})
+        cached = None if perf or seed is None or key in submitted else result_cache.get(key)
+        if perf:
+            future = submit_link(node_a, node_b, params, link_seed(seed, key), perf=True)
+            future.add_done_callback(collect_link_perf)
+        elif seed is None:
+            future = submit_link(node_a, node_b, params, link_seed(seed, key))
+        elif key in submitted:
+            future = shared_link_future(*submitted[key], node_a, node_b)
+        elif cached is not None:
+            future = Future()
+            future.set_result(cached_link_result(cached, node_a, node_b))
+        else:
+            future = submit_link(node_a, node_b, params, link_seed(seed, key))
+            future.add_done_callback(partial(cache_link_result, key, node_a, node_b))
+            submitted[key] = (future, (node_a, node_b))
+        futures.append(future)
+    return futures
+
+
+# Links are independent, so each edge runs in its own worker process.
+@app.route("/simulate", methods=["POST"])
+def simulate():
+    data = request.get_json()
+
+    cities = data["cities"]              # List of city/node names
+    topology = data["topology"]          # "Star", "Ring", or "Mesh"
+    seed = data.get("seed")              # optional, makes the whole run reproducible
+    mode = data.get("mode", "simulate")  # "estimate": closed-form numbers, no Monte Carlo
+    perf = bool(data.get("perf", False)) # per-stage timing and counters in each link result
+    if mode not in ("simulate", "estimate"):
+        return jsonify({"error": f"Unsupported mode: {mode}"}), 400
+    try:
+        links = parse_links(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if mode == "estimate":
+        return jsonify({"results": estimate_links(links, perf)})
+
+    futures = submit_links(links, seed, perf)
+
+    results = []
+    timed_out = []
+    deadline = time.monotonic() + LINK_TIMEOUT_S
+    for link, future in zip(links, futures):
+        try:
+            results.append(future.result(timeout=max(0, deadline - time.monotonic())))
+        except TimeoutError:
+            timed_out.append(future)
+            results.append(failed_link_result(*link, error=f"Timed out after {LINK_TIMEOUT_S}s"))
+        except Exception as e:
+            app.logger.exception("Link %s <--> %s failed", link[0], link[1])
+            results.append(failed_link_result(*link, error=f"{type(e).__name__}: {e}"))
+    abandon_links(timed_out)
 
     return jsonify({"results": results})
 
 
+def sse_event(event, data):
+    """One Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Same payload as /simulate, but every link is sent as soon as it finishes, in completion order:
+#   event: start  {"total": n, "links": ["A <--> B", ...]}
+#   event: link   {"index": i, "result": {...}, "progress": {"done": k, "total": n}}   (i: position in "links")
+#   event: done   {"done": n, "total": n}
+@app.route("/simulate/stream", methods=["POST"])
+def simulate_stream():
+    data = request.get_json()
+    seed = data.get("seed")
+    mode = data.get("mode", "simulate")
+    perf = bool(data.get("perf", False))
+    if mode not in ("simulate", "estimate"):
+        return jsonify({"error": f"Unsupported mode: {mode}"}), 400
+    try:
+        links = parse_links(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if mode == "estimate":
+        futures = []
+        for result in estimate_links(links, perf):
+            futures.append(Future())
+            futures[-1].set_result(result)
+    else:
+        futures = submit_links(links, seed, perf)
+    index = {future: i for i, future in enumerate(futures)}
+
+    def events():
+        total = len(links)
+        yield sse_event("start", {"total": total, "links": [f"{a} <--> {b}" for a, b, *_ in links]})
+        done = set()
+        try:
+            for future in as_completed(futures, timeout=LINK_TIMEOUT_S):
+                i = index[future]
+                link = links[i]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    app.logger.exception("Link %s <--> %s failed", link[0], link[1])
+                    result = failed_link_result(*link, error=f"{type(e).__name__}: {e}")
+                done.add(i)
+                yield sse_event("link", {"index": i, "result": result, "progress": {"done": len(done), "total": total}})
+        except TimeoutError:
+            abandon_links([future for i, future in enumerate(futures) if i not in done])
+            for i, future in enumerate(futures):
+                if i not in done:
+                    done.add(i)
+                    result = failed_link_result(*links[i], error=f"Timed out after {LINK_TIMEOUT_S}s")
+                    yield sse_event("link", {"index": i, "result": result, "progress": {"done": len(done), "total": total}})
+        finally:
+            for future in futures:  # client went away: drop links that have not started
+                future.cancel()
+        yield sse_event("done", {"done": len(done), "total": total})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+# --- Asynchronous job API: submit returns a job id at once, clients poll /jobs/<id> ---
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    data = request.get_json()
+    seed = data.get("seed")
+    perf = bool(data.get("perf", False))
+    try:
+        links = parse_links(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    key = payload_key(links, seed, perf)
+    job_id = job_store.find(key)
+    if job_id is not None:  # same topology already simulated (or running): reuse it
+        return jsonify(job_store.get(job_id)), 200
+
+    job_id = job_store.create(key, links)
+    if not links:
+        return jsonify(job_store.get(job_id)), 202
+    futures = submit_links(links, seed, perf)
+
+    def expire():
+        # same budget as /simulate: links still without a result fail, running ones are abandoned
+        pending = job_store.pending(job_id)
+        for index in pending:
+            job_store.set_result(job_id, index, failed_link_result(*links[index], error=f"Timed out after {LINK_TIMEOUT_S}s"))
+        abandon_links([futures[index] for index in pending])
+
+    deadline = threading.Timer(LINK_TIMEOUT_S, expire)
+    deadline.daemon = True
+
+    def on_done(future, index, link):
+        try:
+            result = future.result()
+        except Exception as e:
+            app.logger.error("Job %s: link %s <--> %s failed: %s", job_id, link[0], link[1], e)
+            result = failed_link_result(*link, error=f"{type(e).__name__}: {e}")
+        job_store.set_result(job_id, index, result)
+        if not job_store.pending(job_id):
+            deadline.cancel()
+
+    for index, (link, future) in enumerate(zip(links, futures)):
+        future.add_done_callback(lambda f, index=index, link=link: on_done(f, index, link))
+    deadline.start()
+
+    return jsonify(job_store.get(job_id)), 202
+
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": f"Unknown job: {job_id}"}), 404
+    return jsonify(job)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Perf totals of every link run with "perf": true, plus result cache counters, in Prometheus text format."""
+    cache = {"qkd_result_cache_hits": result_cache.hits, "qkd_result_cache_misses": result_cache.misses,
+             "qkd_result_cache_entries": len(result_cache.entries)}
+    return Response(perf_totals.prometheus(cache), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(port=5000, debug=True)
 '''
@@ -34,6 +34,37 @@ function haversineDistance(coord1, coord2) {
   return (R * c).toFixed(2); // in km
 }
 
+// Posts to /simulate/stream and calls onLink(result) for every link as soon as the backend finishes it
+const streamSimulation = async (payload, onLink) => {
+  const response = await fetch("http://localhost:5000/simulate/stream", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(payload)
+  });
+  if (!response.ok) {
+    throw new Error(`Simulation stream failed with status ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    // Server-Sent Events are separated by a blank line
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      const message = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      const event = message.match(/^event: (.*)$/m);
+      const data = message.match(/^data: (.*)$/m);
+      if (event && data && event[1] === "link") {
+        onLink(JSON.parse(data[1]).result);
+      }
+    }
+  }
+};
+
 const generateEdges = (topology, nodes) => {
   const edges = [];
   if (topology === 'Star') {
@@ -63,6 +94,7 @@ function Network() {
   const [submitted, setSubmitted] = useState(false);
   const [visualize, setVisualize] = useState(false);
   const [simulationResults, setSimulationResults] = useState([]);
+  const [monteCarlo, setMonteCarlo] = useState(false);
 
   const handleCityChange = (index, value) => {
     const updated = [...selectedCities];
@@ -103,10 +135,19 @@ function Network() {
       protocols: protocolsPerEdge
     };
 
-    axios.post("http://localhost:5000/simulate", payload)
+    // Monte Carlo results replace the estimates link by link as they finish
+    const replaceLink = (result) => {
+      setSimulationResults(prev => prev.map(r => r.link === result.link ? result : r));
+    };
+
+    // Closed-form estimates come back at once; the full Monte Carlo is opt-in and streamed
+    axios.post("http://localhost:5000/simulate", { ...payload, mode: "estimate" })
       .then(response => {
         setSimulationResults(response.data.results);
         setVisualize(true);
+        if (monteCarlo) {
+          return streamSimulation(payload, replaceLink);
+        }
       })
       .catch(error => {
         console.error("Simulation error:", error);
@@ -185,7 +226,13 @@ function Network() {
             })}
 
             {allProtocolsSelected && (
-              <button onClick={handleRun} className="run-btn">Run</button>
+              <>
+                <label>
+                  <input type="checkbox" checked={monteCarlo} onChange={e => setMonteCarlo(e.target.checked)} />
+                  Full Monte Carlo
+                </label>
+                <button onClick={handleRun} className="run-btn">Run</button>
+              </>
             )}
           </div>
         )}
@@ -0,0 +1,285 @@
+'''Benchmark suite: protocol throughput, hardware component microbenchmarks and /simulate latency.
+
+Usage (from the repository root):
+    python -m utils.benchmark --out baseline.json
+    python -m utils.benchmark --out new.json --compare baseline.json --tolerance 0.2
+
+Seeds and pulse counts are fixed, so runs on the same machine are comparable across releases.
+Each benchmark is run --repeat times and reports the fastest and the median run. The JSON output
+holds the environment (git commit, Python, numpy, CPU count) and one record per benchmark; with
+--compare, every benchmark more than --tolerance slower than in the baseline file is listed and
+the exit status is 1.
+'''
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+import simpy
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+import app
+from Hardware.HWP import HalfWavePlate
+from Hardware.MZI import MachZehnderInterferometer
+from Hardware.PBS import PolarizingBeamSplitter
+from Hardware.channel import QuantumChannel
+from Hardware.pulse import Pulse
+from Hardware.rng import make_rng, spawn
+from Hardware.snspd import SNSPD
+from Hardware.state import QuantumState, ket_0, ket_1
+from Protocols.ProtocolHandler import ProtocolHandler
+from Protocols.registry import resolve
+from utils.result_cache import ResultCache
+
+SEED = 1234
+GROUPS = ("protocols", "components", "http")
+
+# run function benchmarked per protocol (the one app.py serves) and its pulse count (sender and run function alike)
+PROTOCOL_RUNS = {
+    "DPS": ("Protocols.DPS:run_dps_batch", 1_000_000),
+    "COW": ("Protocols.COW:run_cow", 100_000),
+    "BB84": ("Protocols.BB84:run_bb84_batch", 1_000_000),
+    "E91": ("Protocols.E91:run_e91_batch", 1_000_000),
+}
+CHANNEL_ARGS = {"length_meters": 10_000, "attenuation_db_per_m": 0.0002, "depol_prob": 0.1, "pol_err_std": 1.0}
+
+COMPONENT_CALLS = 20_000  # calls per component microbenchmark
+
+CITIES = ["Delhi", "Mumbai", "Chennai", "Kolkata", "Bengaluru"]
+TOPOLOGIES = ("Star", "Ring", "Mesh")
+
+
+def time_runs(func, repeat):
+    """Wall times (seconds) of repeat calls of func(); protocol prints are swallowed."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+    return times
+
+
+def record(name, group, times, count, unit):
+    """One result: count units of work per call, throughput from the fastest run."""
+    best = min(times)
+    return {
+        "name": name,
+        "group": group,
+        "min_s": best,
+        "median_s": statistics.median(times),
+        "runs": len(times),
+        "count": count,
+        "unit": unit,
+        "rate_per_s": count / best if best > 0 else None,
+    }
+
+
+# --- Protocols: one link through ProtocolHandler, as simulate_link runs it ---
+def protocol_run(name, run_ref, num_pulses):
+    spec = app.protocols[name]
+    handler = ProtocolHandler(name, spec["node_factory"], spec["channel_factory"], resolve(run_ref))
+    config = {
+        "env": simpy.Environment(),
+        "nodes": {"Alice": {"role": "Sender", "args": {"num_pulses": num_pulses}},
+                  "Bob": {"role": "Receiver", "args": {}}},
+        "channel": {"endpoints": ("Alice", "Bob"), "args": dict(CHANNEL_ARGS)},
+        "protocol_args": {"num_pulses": num_pulses, **spec.get("protocol_args", {})},
+        "log_policy": {"policy": "last", "size": 1},
+        "seed": SEED,
+    }
+    handler.run(config)
+    return handler
+
+
+def work_done(handler, num_pulses):
+    """(count, unit) a run actually processed: run_cow's window of num_pulses ns only fits a quarter of
+    Alice's num_pulses time-bin pairs (4 ns each), so it counts the pairs she started."""
+    alice = handler.node_objs["Alice"]
+    if hasattr(alice, "pairs_started"):
+        return alice.pairs_started, "bin pairs"
+    return num_pulses, "pulses"
+
+
+def bench_protocols(repeat):
+    results = []
+    for name, (run_ref, num_pulses) in PROTOCOL_RUNS.items():
+        handlers = []
+        times = time_runs(lambda: handlers.append(protocol_run(name, run_ref, num_pulses)), repeat)
+        count, unit = work_done(handlers[-1], num_pulses)
+        results.append(record(run_ref.split(":")[1], "protocols", times, count, unit))
+    return results
+
+
+# --- Hardware components: COMPONENT_CALLS calls of one method on seeded components ---
+def component_cases():
+    """name: function making COMPONENT_CALLS calls; components are created outside the timed call."""
+    seeds = iter(spawn(SEED, 8))
+    pulse = lambda polarization=0.0: Pulse(1550e-9, 70e-12, 1.0, polarization=polarization, mean_photon_number=0.2)
+    channel = QuantumChannel("bench", length_meters=10_000, attenuation_db_per_m=0.0002, depol_prob=0.1, rng=next(seeds))
+    snspd = SNSPD(efficiency=0.9, dark_count_rate=10, dead_time=30e-9, timing_jitter=30e-12, rng=next(seeds))
+    mzi = MachZehnderInterferometer(visibility=0.98, phase_noise_std=0.2, rng=next(seeds))
+    hwp = HalfWavePlate(22.5, rng=next(seeds))
+    pbs = PolarizingBeamSplitter(rng=next(seeds))
+    state_rng = make_rng(next(seeds))
+    pulses = [pulse(45.0) for _ in range(COMPONENT_CALLS + 1)]
+
+    def make_pulses():
+        for _ in range(COMPONENT_CALLS):
+            Pulse(1550e-9, 70e-12, 1.0)
+
+    def transmit():
+        for p in pulses[:COMPONENT_CALLS]:
+            channel.transmit(p)
+
+    def detect():
+        for i, p in enumerate(pulses[:COMPONENT_CALLS]):
+            snspd.detect(p, current_time=i * 1e-6)
+
+    def measure_mzi():
+        for i in range(COMPONENT_CALLS):
+            mzi.measure(pulses[i], pulses[i + 1], current_time=i * 1e-6)
+
+    def apply_hwp():
+        for p in pulses[:COMPONENT_CALLS]:
+            hwp.apply(p)
+
+    def split_pbs():
+        for p in pulses[:COMPONENT_CALLS]:
+            pbs.split(p)
+
+    def measure_state():
+        plus = (ket_0 + ket_1) / np.sqrt(2)
+        state = QuantumState(ket=plus)
+        for _ in range(COMPONENT_CALLS):
+            state.reset(ket=plus)
+            state.measure(rng=state_rng)
+
+    return {
+        "Pulse": make_pulses,
+        "QuantumChannel.transmit": transmit,
+        "SNSPD.detect": detect,
+        "MachZehnderInterferometer.measure": measure_mzi,
+        "HalfWavePlate.apply": apply_hwp,
+        "PolarizingBeamSplitter.split": split_pbs,
+        "QuantumState.measure": measure_state,
+    }
+
+
+def bench_components(repeat):
+    return [record(name, "components", time_runs(func, repeat), COMPONENT_CALLS, "calls")
+            for name, func in component_cases().items()]
+
+
+# --- HTTP: /simulate round trips through the Flask test client ---
+def topology_payload(topology, cities=CITIES, seed=SEED, mode="simulate"):
+    """/simulate payload as src/Network.jsx builds it: edges by topology, protocols assigned in turn."""
+    n = len(cities)
+    if topology == "Star":
+        pairs = [(0, i) for i in range(1, n)]
+    elif topology == "Ring":
+        pairs = [(i, (i + 1) % n) for i in range(n)]
+    else:
+        pairs = [(i, j) for i in range(n) for j in range(i + 1, n)]
+    names = sorted(PROTOCOL_RUNS)
+    edges = [{"nodes": [cities[i], cities[j]], "distance": 10_000 * (1 + abs(i - j))} for i, j in pairs]
+    protocols = {f"{cities[i]}-{cities[j]}": names[k % len(names)] for k, (i, j) in enumerate(pairs)}
+    return {"cities": list(cities), "topology": topology, "edges": edges, "protocols": protocols,
+            "seed": seed, "mode": mode}
+
+
+def bench_http(repeat):
+    client = app.app.test_client()
+
+    def post(payload):
+        app.result_cache = ResultCache(max_entries=app.RESULT_CACHE_SIZE)  # every run simulates, none is a cache hit
+        response = client.post("/simulate", json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"/simulate returned {response.status_code}: {response.get_data(as_text=True)}")
+
+    results = []
+    post(topology_payload("Star"))  # starts the worker pool, not timed
+    for mode in ("simulate", "estimate"):
+        for topology in TOPOLOGIES:
+            payload = topology_payload(topology, mode=mode)
+            times = time_runs(lambda: post(payload), repeat)
+            results.append(record(f"/simulate {topology} ({mode})", "http", times, len(payload["edges"]), "links"))
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "simpy": getattr(simpy, "__version__", None),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": SEED,
+    }
+
+
+def run_benchmarks(groups=GROUPS, repeat=3):
+    """Runs the selected groups and returns {"environment": ..., "results": [...]}."""
+    benches = {"protocols": bench_protocols, "components": bench_components, "http": bench_http}
+    results = []
+    for group in groups:
+        results.extend(benches[group](repeat))
+    return {"environment": environment(), "results": results}
+
+
+def compare(report, baseline, tolerance=0.2):
+    """Benchmarks whose fastest run is more than tolerance (fraction) slower than in baseline."""
+    before = {r["name"]: r for r in baseline["results"]}
+    regressions = []
+    for r in report["results"]:
+        old = before.get(r["name"])
+        if old and old["min_s"] > 0 and r["min_s"] > old["min_s"] * (1 + tolerance):
+            regressions.append({"name": r["name"], "baseline_s": old["min_s"], "min_s": r["min_s"],
+                                "slowdown": r["min_s"] / old["min_s"]})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark protocols, hardware components and the /simulate endpoint.")
+    parser.add_argument("--group", nargs="+", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default="benchmark.json", help="JSON file for the report")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown against the baseline, 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.group, args.repeat)
+    for r in report["results"]:
+        print(f"{r['group']:<10} {r['name']:<40} {r['min_s'] * 1e3:10.2f} ms  {r['rate_per_s']:14.1f} {r['unit']}/s",
+              file=sys.stderr)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+        for r in report["regressions"]:
+            print(f"REGRESSION {r['name']}: {r['baseline_s'] * 1e3:.2f} ms -> {r['min_s'] * 1e3:.2f} ms "
+                  f"({r['slowdown']:.2f}x)", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    with open(args.out, "w") as f:  # a file, workers' prints would interleave with stdout
+        json.dump(report, f, indent=2)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
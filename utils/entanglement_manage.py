@@ -1,5 +1,7 @@
 import sys
 import os
+import itertools
+from collections import OrderedDict
 import numpy as np
 
 # Ensure parent directory is in path
@@ -7,31 +9,88 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from Hardware.node import Node
 from Hardware.gates import H, CX
 from Hardware.state import QuantumState
+
+BASIS_STATES = {
+    '00': np.array([1, 0, 0, 0], dtype=complex),
+    '01': np.array([0, 1, 0, 0], dtype=complex),
+    '10': np.array([0, 0, 1, 0], dtype=complex),
+    '11': np.array([0, 0, 0, 1], dtype=complex)
+}
+# Bell states are fixed, so the H⊗I then CNOT preparation is done once per type
+BELL_STATES = {bell_type: CX @ (np.kron(H, np.eye(2, dtype=complex)) @ ket) for bell_type, ket in BASIS_STATES.items()}
+
+
 class EntanglementManager:
     '''Creates Bell pairs and distributes among 2 nodes. The global state is known by both nodes, but depending on 
     whether it's node A or B the measurement will be different. Future work: extend to GHZ(n_qubits) to distribute among
-    n nodes.'''
-    def __init__(self):
-        self.entangled_pairs = {}  # key: pair_id, value: (state_vector, node_A, node_B)
+    n nodes.
+    Pairs have a lifecycle so long runs use constant memory: a pair is released once both nodes have measured it
+    (consume_on_measure), when it is older than decoherence_time (simulated seconds), or when capacity is reached
+    (oldest first). Released state objects are pooled and re-initialised for new pairs.'''
+    def __init__(self, state_backend=QuantumState, capacity=None, decoherence_time=None, consume_on_measure=True):
+        self.entangled_pairs = OrderedDict()  # key: pair_id, value: (state_vector, node_A, node_B), oldest first
+        self.state_backend = state_backend  # QuantumState (density matrix) or PauliState
+        self.capacity = capacity
+        self.decoherence_time = decoherence_time
+        self.consume_on_measure = consume_on_measure
+        self.created_at = {}   # pair_id: simulated creation time
+        self.measured = {}     # pair_id: set of node ids that measured their qubit
+        self._ids = itertools.count()
+        self._pool = []        # released states, reused by create_bell_pair
+        self.max_pool = 64
 
     def create_bell_pair(self, node_a:Node, node_b: Node, bell_type='00'):
-        
-        basis_states = {
-            '00': np.array([1, 0, 0, 0], dtype=complex),
-            '01': np.array([0, 1, 0, 0], dtype=complex),
-            '10': np.array([0, 0, 1, 0], dtype=complex),
-            '11': np.array([0, 0, 0, 1], dtype=complex)
-        }
-        state = basis_states[bell_type]
-        H_I = np.kron(H, np.eye(2, dtype=complex)) #HI
-        state = H_I @ state
-        state = CX @ state
-        shared_state = QuantumState(ket=state)
-        pair_id = f"{node_a.node_id}_{node_b.node_id}_{len(self.entangled_pairs)}"
+        now = node_a.env.now
+        self.evict_expired(now)
+        if self.capacity is not None:
+            while len(self.entangled_pairs) >= self.capacity:
+                self.release(next(iter(self.entangled_pairs)))
+
+        state = BELL_STATES[bell_type]
+        shared_state = self._new_state(state)
+        pair_id = f"{node_a.node_id}_{node_b.node_id}_{next(self._ids)}"
         self.entangled_pairs[pair_id] = (shared_state, node_a, node_b)
+        self.created_at[pair_id] = now
 
-        node_a.receive_entangled_qubit(shared_state, qubit_index=0, pair_id=pair_id)
-        node_b.receive_entangled_qubit(shared_state, qubit_index=1, pair_id=pair_id)
+        node_a.receive_entangled_qubit(shared_state, qubit_index=0, pair_id=pair_id, manager=self)
+        node_b.receive_entangled_qubit(shared_state, qubit_index=1, pair_id=pair_id, manager=self)
 
         return pair_id, state
 
+    def consume(self, node, pair_id):
+        """Called by a node after measuring its qubit; the pair is released once both nodes have."""
+        if not self.consume_on_measure or pair_id not in self.entangled_pairs:
+            return
+        measured = self.measured.setdefault(pair_id, set())
+        measured.add(node.node_id)
+        if len(measured) == 2:
+            self.release(pair_id)
+
+    def release(self, pair_id):
+        """Drops a pair from the manager and both nodes, and returns its state object to the pool."""
+        entry = self.entangled_pairs.pop(pair_id, None)
+        if entry is None:
+            return
+        shared_state, node_a, node_b = entry
+        for node in (node_a, node_b):
+            if node.components.get(pair_id) is shared_state:
+                del node.components[pair_id]
+        self.created_at.pop(pair_id, None)
+        self.measured.pop(pair_id, None)
+        if len(self._pool) < self.max_pool:
+            self._pool.append(shared_state)
+
+    def evict_expired(self, now):
+        """Releases every pair created more than decoherence_time before now."""
+        if self.decoherence_time is None:
+            return
+        while self.entangled_pairs:
+            pair_id = next(iter(self.entangled_pairs))
+            if now - self.created_at[pair_id] <= self.decoherence_time:
+                break
+            self.release(pair_id)
+
+    def _new_state(self, ket):
+        if self._pool:
+            return self._pool.pop().reset(ket=ket)
+        return self.state_backend(ket=ket)
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+def payload_key(links, seed=None, perf=False):
+    """Deterministic key for a simulation request: the same links, protocols, seed and perf flag give the same key."""
+    blob = json.dumps({"links": links, "seed": seed, **({"perf": True} if perf else {})}, sort_keys=True)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class JobStore:
+    '''Bounded, thread-safe store of simulation jobs. A job holds one result slot per link, filled in
+    by the worker callbacks as links finish. Finished jobs are kept (least recently used first out)
+    so that submitting the same topology again returns the stored job instead of re-running it.'''
+    def __init__(self, max_jobs=100):
+        self.max_jobs = max_jobs
+        self.jobs = OrderedDict()  # job_id: job dict, oldest first
+        self.by_key = {}           # payload key: job_id
+        self.lock = threading.Lock()
+
+    def find(self, key):
+        """Returns the id of a stored job for this payload key (marking it recently used), or None."""
+        with self.lock:
+            job_id = self.by_key.get(key)
+            if job_id is not None:
+                self.jobs.move_to_end(job_id)
+            return job_id
+
+    def create(self, key, links):
+        """New job with one empty result slot per link; a job without links is done at once."""
+        with self.lock:
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self.jobs[job_id] = {
+                "job_id": job_id,
+                "key": key,
+                "status": "queued" if links else "done",
+                "created": now,
+                "finished": None if links else now,
+                "links": [f"{a} <--> {b}" for a, b, *_ in links],
+                "results": [None] * len(links),
+                "done": 0,
+            }
+            self.by_key[key] = job_id
+            self._evict()
+            return job_id
+
+    def set_result(self, job_id, index, result):
+        """
+        Stores the result of one link; the job is done once every link has reported.
+        The first result for a slot wins, so a link finishing after its deadline result is ignored.
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:  # evicted while running
+                return
+            if job["results"][index] is not None:
+                return
+            job["results"][index] = result
+            job["done"] += 1
+            job["status"] = "running"
+            if job["done"] == len(job["results"]):
+                job["status"] = "done"
+                job["finished"] = time.time()
+                if any("error" in r for r in job["results"]):
+                    # don't serve partial failures from the cache, resubmitting runs it again
+                    self.by_key.pop(job["key"], None)
+
+    def pending(self, job_id):
+        """Indices of the links of a job that have no result yet (empty for unknown jobs)."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return []
+            return [i for i, r in enumerate(job["results"]) if r is None]
+
+    def get(self, job_id):
+        """Snapshot of a job safe to serialise, or None if unknown/evicted."""
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {
+                "job_id": job_id,
+                "status": job["status"],
+                "progress": {"done": job["done"], "total": len(job["results"])},
+                "links": list(job["links"]),
+                "results": [r for r in job["results"] if r is not None],
+            }
+
+    def _evict(self):
+        # only finished jobs are evicted, running ones still have callbacks pending
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            job = self.jobs[job_id]
+            if job["status"] == "done":
+                del self.jobs[job_id]
+                if self.by_key.get(job["key"]) == job_id:
+                    del self.by_key[job["key"]]
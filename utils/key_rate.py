@@ -1,5 +1,7 @@
 import math
 
+import numpy as np
+
 def binary_entropy(q):
     """Binary Shannon entropy."""
     if q <= 0 or q >= 1:
@@ -21,3 +23,187 @@ def compute_key_rate(qber, sifted_rate=0.5):
     h = binary_entropy(qber)
     key_rate = sifted_rate * max(0, 1 - 2 * h)
     return round(key_rate, 6)
+
+
+# ---------------------------------------------------------------------------
+# Vectorized key-rate formulas. Every function below takes NumPy arrays (or
+# scalars) and broadcasts, so whole QBER x distance x block-size grids are
+# evaluated in one call instead of running a simulation per point.
+# ---------------------------------------------------------------------------
+
+F_EC = 1.16           # error-correction inefficiency (leak = F_EC * H(E) per sifted bit)
+EPS_SEC = 1e-10       # secrecy parameter of the finite key
+EPS_COR = 1e-15       # correctness parameter of the finite key
+PE_FRACTION = 0.1     # fraction of a sifted block sacrificed for parameter estimation
+
+# secret key is produced per clock cycle; COW counts time-bin pairs (2 bins of 1 ns)
+CLOCK_RATES = {"BB84": 1e9, "DPS": 1e9, "COW": 0.5e9, "E91": 10e6}
+
+
+def binary_entropy_array(q):
+    """Vectorized binary_entropy: H(q) elementwise, 0 outside (0, 1)."""
+    q = np.asarray(q, dtype=float)
+    p = np.clip(q, 1e-300, 1 - 1e-16)
+    h = -p * np.log2(p) - (1 - p) * np.log2(1 - p)
+    return np.where((q <= 0) | (q >= 1), 0.0, h)
+
+
+def transmittance(distance_km, attenuation_db_per_km=0.2):
+    """Fibre transmittance 10^(-alpha*L/10), same law as OpticalChannel."""
+    return 10 ** (-attenuation_db_per_km * np.asarray(distance_km, dtype=float) / 10)
+
+
+def finite_key_terms(block_size, pe_fraction=PE_FRACTION, eps_sec=EPS_SEC, eps_cor=EPS_COR):
+    """
+    Finite-size terms for blocks of block_size sifted bits (Tomamichel et al., 2012).
+    A block is split into n key bits and k = pe_fraction * block_size parameter-estimation bits.
+
+    Args:
+        block_size (array): sifted bits per block; np.inf gives the asymptotic limit
+        pe_fraction (float): fraction of the block used to estimate the error rate
+        eps_sec, eps_cor (float): secrecy and correctness parameters
+
+    Returns:
+        tuple: (key_fraction, delta, overhead) -- fraction of the block that becomes key, upper deviation
+        of the phase error rate, and the security cost log2(2/(eps_sec^2 eps_cor)) per sifted bit
+    """
+    N = np.asarray(block_size, dtype=float)
+    finite = np.isfinite(N)
+    N_safe = np.where(finite, N, 1.0)
+    n = (1 - pe_fraction) * N_safe
+    k = pe_fraction * N_safe
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta = np.sqrt((n + k) / (n * k) * (k + 1) / k * np.log(1 / eps_sec))
+        overhead = np.log2(2 / (eps_sec ** 2 * eps_cor)) / N_safe
+    key_fraction = np.where(finite, 1 - pe_fraction, 1.0)
+    return key_fraction, np.where(finite, delta, 0.0), np.where(finite, overhead, 0.0)
+
+
+def _gain_and_error(eta, mu, e_d, y0):
+    """Detection probability and QBER of a weak coherent pulse with mean photon number mu."""
+    signal = 1 - np.exp(-eta * mu)
+    gain = y0 + signal
+    return gain, (y0 / 2 + e_d * signal) / gain
+
+
+def bb84_decoy_rate(eta, e_d, y0, mu=0.5, nu=0.1, f_ec=F_EC, delta=0.0):
+    """
+    Decoy-state BB84 with a vacuum and a weak decoy (Ma, Qi, Zhao, Lo 2005).
+
+    Args:
+        eta (array): total transmittance (channel x detector efficiency)
+        e_d (array): optical (misalignment) error probability
+        y0 (array): dark-count probability per pulse
+        mu, nu (float): signal and weak-decoy mean photon numbers
+        delta (array): finite-size deviation added to the single-photon phase error
+
+    Returns:
+        tuple: (sifted, secret) bits per pulse
+    """
+    q_mu, e_mu = _gain_and_error(eta, mu, e_d, y0)
+    q_nu, e_nu = _gain_and_error(eta, nu, e_d, y0)
+    y1 = mu / (mu * nu - nu ** 2) * (q_nu * np.exp(nu) - q_mu * np.exp(mu) * nu ** 2 / mu ** 2
+                                     - (mu ** 2 - nu ** 2) / mu ** 2 * y0)
+    y1 = np.maximum(y1, 1e-300)
+    e1 = np.clip((e_nu * q_nu * np.exp(nu) - y0 / 2) / (y1 * nu), 0, 0.5)
+    q1 = y1 * mu * np.exp(-mu)
+    sifted = 0.5 * q_mu
+    secret = 0.5 * (q1 * (1 - binary_entropy_array(np.minimum(e1 + delta, 0.5))) - q_mu * f_ec * binary_entropy_array(e_mu))
+    return sifted, secret
+
+
+def dps_rate(eta, e_d, y0, mu=0.2, f_ec=F_EC, delta=0.0):
+    """
+    DPS against general individual attacks (Waks, Takesue, Yamamoto 2006):
+    R = Q[(1 - 2mu) * tau(E) - f H(E)], tau(e) = -log2(1 - e^2 - (1 - 6e)^2 / 2).
+
+    Returns:
+        tuple: (sifted, secret) bits per pulse
+    """
+    gain, err = _gain_and_error(eta, mu, e_d, y0)
+    e = np.clip(err + delta, 0, 1 / 6)
+    tau = -np.log2(1 - e ** 2 - (1 - 6 * e) ** 2 / 2)
+    return gain, gain * ((1 - 2 * mu) * tau - f_ec * binary_entropy_array(err))
+
+
+def cow_rate(eta, e_d, y0, mu=0.5, channel_transmittance=1.0, decoy_prob=0.1, monitor_ratio=0.1,
+             visibility=0.98, f_ec=F_EC, delta=0.0):
+    """
+    COW planning estimate: Eve's information is a beam-splitting term (photons lost in the channel)
+    plus a phase-error term bounded by the monitor-line visibility, e_ph = (1 - V) / 2.
+    A simplified bound for rate-vs-distance curves, not a security proof.
+
+    Returns:
+        tuple: (sifted, secret) bits per time-bin pair
+    """
+    gain, err = _gain_and_error(eta, mu, e_d, y0)
+    sifted = (1 - decoy_prob) * (1 - monitor_ratio) * gain
+    p_bs = 1 - np.exp(-mu * (1 - channel_transmittance))
+    e_ph = np.minimum((1 - visibility) / 2 + delta, 0.5)
+    eve = p_bs + (1 - p_bs) * binary_entropy_array(e_ph)
+    return sifted, sifted * (1 - eve - f_ec * binary_entropy_array(err))
+
+
+def e91_rate(eta, e_d, y0, sift_fraction=2 / 9, f_ec=F_EC, delta=0.0):
+    """
+    Entanglement-based (BBM92-style) rate: coincidences eta (both arms) plus accidental y0,
+    key from the 2 of 9 basis combinations that match for ALICE_ANGLES/BOB_ANGLES.
+
+    Returns:
+        tuple: (sifted, secret) bits per round
+    """
+    gain = eta + y0
+    err = (e_d * eta + y0 / 2) / gain
+    sifted = sift_fraction * gain
+    return sifted, sifted * (1 - f_ec * binary_entropy_array(err) - binary_entropy_array(np.minimum(err + delta, 0.5)))
+
+
+PROTOCOL_RATES = {"BB84": bb84_decoy_rate, "DPS": dps_rate, "COW": cow_rate, "E91": e91_rate}
+
+
+def secret_key_rate(protocol, qber, distance_km, block_size=np.inf, attenuation_db_per_km=0.2,
+                    detector_efficiency=0.9, dark_count_rate=10, detection_window=1e-9,
+                    clock_rate=None, pe_fraction=PE_FRACTION, eps_sec=EPS_SEC, eps_cor=EPS_COR, **params):
+    """
+    Secret key rate (bits/s) of a protocol, broadcast over its array arguments.
+
+    Args:
+        protocol (str): "BB84", "DPS", "COW" or "E91"
+        qber (array): optical error probability e_d; dark counts add to it as the distance grows
+        distance_km (array): link length
+        block_size (array): sifted bits per finite-key block, np.inf for the asymptotic rate
+        detector_efficiency, dark_count_rate, detection_window: SNSPD parameters (two detectors)
+        clock_rate (float): pulses (COW: pairs, E91: rounds) per second, CLOCK_RATES by default
+        **params: protocol-specific options (mu, nu, decoy_prob, visibility, f_ec, ...)
+
+    Returns:
+        np.ndarray: secret key rate in bits/s, clipped at 0
+    """
+    protocol = protocol.upper()
+    t = transmittance(distance_km, attenuation_db_per_km)
+    y0 = 2 * dark_count_rate * detection_window
+    if protocol == "E91":
+        eta = t * detector_efficiency ** 2
+    else:
+        eta = t * detector_efficiency
+    if protocol == "COW":
+        params.setdefault("channel_transmittance", t)
+
+    key_fraction, delta, overhead = finite_key_terms(block_size, pe_fraction, eps_sec, eps_cor)
+    sifted, secret = PROTOCOL_RATES[protocol](eta, np.asarray(qber, dtype=float), y0, delta=delta, **params)
+    per_pulse = key_fraction * secret - sifted * overhead
+    rate = np.maximum(per_pulse, 0) * (clock_rate or CLOCK_RATES[protocol])
+    return rate
+
+
+def key_rate_grid(protocol, qber, distance_km, block_size=None, **kwargs):
+    """
+    Outer-product sweep of secret_key_rate: returns an array of shape (len(qber), len(distance_km))
+    or, with block_size given, (len(qber), len(distance_km), len(block_size)).
+    """
+    q = np.atleast_1d(np.asarray(qber, dtype=float))
+    d = np.atleast_1d(np.asarray(distance_km, dtype=float))
+    if block_size is None:
+        return secret_key_rate(protocol, q[:, None], d[None, :], **kwargs)
+    n = np.atleast_1d(np.asarray(block_size, dtype=float))
+    return secret_key_rate(protocol, q[:, None, None], d[None, :, None], n[None, None, :], **kwargs)
@@ -0,0 +1,251 @@
+'''Per-stage wall time and event counters for one link run.
+
+ProtocolHandler.run creates a PerfRecorder when the config has "perf": True and hands it to every
+node as node.perf; otherwise nodes keep NULL_PERF, whose methods do nothing. Stages are exclusive:
+time spent in a nested stage is only counted there, so the stages of a run add up to its wall time.
+
+Stages recorded by ProtocolHandler (see instrument_link):
+    setup      building the nodes and the channel
+    emission   the sender's run generator (pulse preparation), outside the stages below
+    send       Node.send and Node.send_train: logging and scheduling the delivery
+    channel    loss sampling (transmit, surviving_indices) and send_train's noise
+    detection  the receiver's receive and the SNSPDs
+    simpy      SimPy's event loop (Environment.step) itself
+    sifting    marked by the run functions around their post-processing
+    run        whatever else the run function does (batch and estimate modes run here)
+Counters: pulses_emitted, pulses_lost, pulses_delivered, clicks, dark_counts, sifted_bits.
+'''
+import inspect
+import threading
+from collections import defaultdict
+from time import perf_counter
+
+
+class _Stage:
+    __slots__ = ("recorder", "name", "started")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.started = self.recorder._enter()
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder._exit(self.name, self.started)
+        return False
+
+
+class _TimedGenerator:
+    """Generator wrapper timing every resumption as one stage; SimPy drives it through send/throw."""
+    def __init__(self, recorder, generator, stage):
+        self.recorder = recorder
+        self.generator = generator
+        self.stage = stage
+        self.__name__ = getattr(generator, "__name__", "generator")
+
+    @property
+    def gi_frame(self):
+        return self.generator.gi_frame
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def send(self, value):
+        started = self.recorder._enter()
+        try:
+            return self.generator.send(value)
+        finally:
+            self.recorder._exit(self.stage, started)
+
+    def throw(self, *args):
+        started = self.recorder._enter()
+        try:
+            return self.generator.throw(*args)
+        finally:
+            self.recorder._exit(self.stage, started)
+
+    def close(self):
+        return self.generator.close()
+
+
+class PerfRecorder:
+    enabled = True
+
+    def __init__(self):
+        self.stages = defaultdict(float)  # stage: exclusive seconds
+        self.counters = defaultdict(int)
+        self._nested = [0.0]              # seconds spent in child stages, one entry per open stage
+
+    def stage(self, name):
+        """Context manager timing its body as stage name."""
+        return _Stage(self, name)
+
+    def count(self, name, n=1):
+        self.counters[name] += int(n)
+
+    def instrument(self, obj, method_name, stage, on_result=None):
+        """
+        Replaces obj.method_name (on the instance only) with a version timed as stage.
+        Generator methods get their generator wrapped, so every resumption is timed.
+        on_result(recorder, args, result) can update counters from a call's arguments and result.
+        """
+        original = getattr(obj, method_name, None)
+        if original is None:
+            return
+        if inspect.isgeneratorfunction(original):
+            def timed(*args, **kwargs):
+                return _TimedGenerator(self, original(*args, **kwargs), stage)
+        else:
+            def timed(*args, **kwargs):
+                started = self._enter()
+                try:
+                    result = original(*args, **kwargs)
+                finally:
+                    self._exit(stage, started)
+                if on_result is not None:
+                    on_result(self, args, result)
+                return result
+        setattr(obj, method_name, timed)
+
+    def as_dict(self):
+        return {
+            "stages_s": {name: round(seconds, 6) for name, seconds in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def _enter(self):
+        self._nested.append(0.0)
+        return perf_counter()
+
+    def _exit(self, name, started):
+        elapsed = perf_counter() - started
+        self.stages[name] += elapsed - self._nested.pop()
+        self._nested[-1] += elapsed
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullRecorder:
+    """Recorder used when perf is off: same interface, no work."""
+    enabled = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, name, n=1):
+        pass
+
+    def instrument(self, obj, method_name, stage, on_result=None):
+        pass
+
+    def as_dict(self):
+        return None
+
+
+NULL_PERF = NullRecorder()
+
+
+# --- Counter hooks for instrument_link ---
+def _count_transmit(perf, args, result):
+    perf.count("pulses_emitted")
+    perf.count("pulses_lost" if result is None else "pulses_delivered")
+
+
+def _count_survivors(perf, args, result):
+    perf.count("pulses_emitted", args[0])
+    perf.count("pulses_delivered", len(result))
+    perf.count("pulses_lost", args[0] - len(result))
+
+
+def _count_detect(perf, args, result):
+    click, info = result
+    if click:
+        perf.count("clicks")
+        if info.get("dark_count"):
+            perf.count("dark_counts")
+
+
+def _count_detect_batch(perf, args, result):
+    clicked, _, dark = result
+    perf.count("clicks", clicked.sum())
+    perf.count("dark_counts", dark.sum())
+
+
+def _detectors(node):
+    # SNSPDs held by a node directly or through an interferometer (snspd0 / snspd1)
+    found = {}
+    for value in list(vars(node).values()) + list(node.components.values()):
+        for candidate in (value, getattr(value, "snspd0", None), getattr(value, "snspd1", None)):
+            if hasattr(candidate, "detect") and hasattr(candidate, "dark_count_rate"):
+                found[id(candidate)] = candidate
+    return list(found.values())
+
+
+def instrument_link(perf, env, nodes, channel):
+    """Times the stages listed in the module docstring on this link's env, nodes and channel."""
+    perf.instrument(env, "step", "simpy")
+    for node in nodes:
+        node.perf = perf
+        perf.instrument(node, "run", "emission")
+        perf.instrument(node, "run_skipping", "emission")
+        perf.instrument(node, "send", "send")
+        perf.instrument(node, "receive", "detection")
+        for snspd in _detectors(node):
+            perf.instrument(snspd, "detect", "detection", _count_detect)
+            perf.instrument(snspd, "detect_photons", "detection", _count_detect)
+            perf.instrument(snspd, "detect_batch", "detection", _count_detect_batch)
+    if channel is not None:
+        instrument_channel(perf, channel)
+
+
+def instrument_channel(perf, channel):
+    """Channel part of instrument_link, for run functions that build their own channel."""
+    perf.instrument(channel, "transmit", "channel", _count_transmit)
+    perf.instrument(channel, "surviving_indices", "channel", _count_survivors)
+
+
+class PerfTotals:
+    '''Running totals of the perf blocks of finished links, per protocol, for the /metrics endpoint.'''
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.links = defaultdict(int)                          # protocol: links
+        self.stages = defaultdict(lambda: defaultdict(float))  # protocol: {stage: seconds}
+        self.counters = defaultdict(lambda: defaultdict(int))  # protocol: {counter: total}
+
+    def add(self, protocol, perf):
+        with self.lock:
+            self.links[protocol] += 1
+            for name, seconds in perf.get("stages_s", {}).items():
+                self.stages[protocol][name] += seconds
+            for name, n in perf.get("counters", {}).items():
+                self.counters[protocol][name] += n
+
+    def prometheus(self, extra=None):
+        """Totals in the Prometheus text exposition format; extra is {metric name: value} of other gauges."""
+        lines = []
+        with self.lock:
+            lines += ["# HELP qkd_links_total Links simulated with perf enabled.", "# TYPE qkd_links_total counter"]
+            lines += [f'qkd_links_total{{protocol="{p}"}} {n}' for p, n in sorted(self.links.items())]
+            lines += ["# HELP qkd_stage_seconds_total Wall time per simulation stage.", "# TYPE qkd_stage_seconds_total counter"]
+            lines += [f'qkd_stage_seconds_total{{protocol="{p}",stage="{s}"}} {t:.6f}'
+                      for p, stages in sorted(self.stages.items()) for s, t in sorted(stages.items())]
+            lines += ["# HELP qkd_events_total Pulses, clicks and sifted bits.", "# TYPE qkd_events_total counter"]
+            lines += [f'qkd_events_total{{protocol="{p}",event="{c}"}} {n}'
+                      for p, counters in sorted(self.counters.items()) for c, n in sorted(counters.items())]
+        for name, value in (extra or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
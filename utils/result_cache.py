@@ -0,0 +1,65 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def config_key(config):
+    """Content address of a link configuration: sha256 of its canonical JSON form."""
+    blob = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+class ResultCache:
+    '''LRU cache of finished link results, keyed by config_key. Entries must be JSON-serialisable.
+    With a path, every entry is also written to <path>/<key>.json so the cache survives restarts;
+    memory is bounded by max_entries, the on-disk store is not evicted.'''
+    def __init__(self, max_entries=1024, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()  # key: value, least recently used first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def get(self, key):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+        value = self._load(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._insert(key, value)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self._insert(key, value)
+        if self.path:
+            tmp = os.path.join(self.path, f"{key}.json.tmp")
+            with open(tmp, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp, os.path.join(self.path, f"{key}.json"))  # atomic, readers never see half a file
+
+    def _insert(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def _load(self, key):
+        if not self.path:
+            return None
+        try:
+            with open(os.path.join(self.path, f"{key}.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
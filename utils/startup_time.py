@@ -0,0 +1,65 @@
+'''Measures server and worker startup against the budgets in app.py.
+
+Usage (from the repository root):
+    python -m utils.startup_time [--repeat 3]
+
+App startup is the import of app.py in a fresh interpreter. Worker startup is the time from
+creating a process pool until a worker has loaded every protocol (app.load_protocols), i.e. what
+the first link of each protocol pays. The best of --repeat runs is reported; the exit status is 1
+when either is over budget.
+'''
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(ROOT)
+
+IMPORT_APP = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+
+
+def app_startup_time():
+    """Seconds to import app.py in a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-c", IMPORT_APP], cwd=ROOT, check=True,
+                         capture_output=True, text=True).stdout
+    return float(out.strip().splitlines()[-1])
+
+
+def worker_startup_time():
+    """Seconds from creating a one-worker pool until the worker has loaded every protocol."""
+    import app
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        executor.submit(app.load_protocols).result()
+        return time.perf_counter() - started
+
+
+def measure(repeat=3):
+    import app
+    app_s = min(app_startup_time() for _ in range(repeat))
+    worker_s = min(worker_startup_time() for _ in range(repeat))
+    return {
+        "app_startup_s": round(app_s, 4),
+        "app_budget_s": app.APP_STARTUP_BUDGET_S,
+        "worker_startup_s": round(worker_s, 4),
+        "worker_budget_s": app.WORKER_STARTUP_BUDGET_S,
+        "within_budget": app_s <= app.APP_STARTUP_BUDGET_S and worker_s <= app.WORKER_STARTUP_BUDGET_S,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check app and worker startup time against their budgets.")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement, the fastest is kept")
+    args = parser.parse_args(argv)
+
+    report = measure(args.repeat)
+    print(json.dumps(report, indent=2))
+    return 0 if report["within_budget"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,207 @@
+'''Parameter sweeps over ProtocolHandler: runs one link per grid point on a process pool.
+
+Usage (from the repository root):
+    python -m utils.sweep --protocol DPS BB84 --distance 1000:100000:10 --param depol_prob=0,0.1 --out sweep.csv
+
+Every finished point is appended to the CSV right away, so an interrupted sweep picks up where
+it stopped when run again with the same --out. Each point's seed is derived from the sweep seed
+and the point's configuration, so a point gives the same result whatever the grid or worker count.
+'''
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app import protocols, link_params, link_seed, simulate_link
+from utils.result_cache import config_key
+
+RESULT_COLUMNS = ["seed", "qber", "key_rate", "metrics", "error", "key"]
+ALIASES = {"distance": "length_meters"}  # grid names that map to a differently named argument
+
+
+def expand_grid(grid):
+    """
+    Cartesian product of a grid {name: [values]} as a list of points (dicts), in a fixed order.
+    A scalar value is treated as a one-element list. "protocol" must be one of the grid names.
+    """
+    names = list(grid)
+    values = [v if isinstance(v, (list, tuple, np.ndarray)) else [v] for v in grid.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+
+def point_params(point):
+    """
+    link_params for a grid point, with every other grid value written into the sections that
+    take it: channel_args, sender_args and protocol_args (a name found in several is set in all,
+    e.g. num_pulses). Names found nowhere go to protocol_args.
+    """
+    point = {ALIASES.get(k, k): v for k, v in point.items()}
+    params = link_params(point.get("length_meters", 1000), point["protocol"])
+    for name, value in point.items():
+        if name == "protocol":
+            continue
+        value = value.item() if isinstance(value, np.generic) else value
+        sections = [s for s in ("channel_args", "sender_args", "protocol_args") if name in params[s]]
+        for section in sections or ["protocol_args"]:
+            params[section][name] = value
+    return params
+
+
+def run_point(point, params, seed, mode):
+    """Worker: one grid point through simulate_link, flattened to a table row."""
+    row = dict(point)
+    try:
+        result = simulate_link("Alice", "Bob", params, seed, mode=mode)
+        row.update(qber=result["qber"], key_rate=result["key_rate"], metrics=json.dumps(result["metrics"]), error="")
+    except Exception as e:
+        row.update(qber=None, key_rate=0.0, metrics="{}", error=f"{type(e).__name__}: {e}")
+    return row
+
+
+def read_checkpoint(path, columns):
+    """Rows already written to a sweep CSV, keyed by their point key."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames and reader.fieldnames != columns:
+            raise ValueError(f"{path} holds a sweep over {reader.fieldnames}, not {columns}; "
+                             "use another output file or resume=False")
+        return {row["key"]: row for row in reader}
+
+
+def run_sweep(grid, out=None, seed=0, mode="simulate", max_workers=None, resume=True):
+    """
+    Runs every point of the grid and returns the rows in grid order.
+
+    Args:
+        grid (dict): {name: [values]}, must include "protocol"; other names are channel, sender or
+            protocol arguments (distance is an alias for length_meters)
+        out (str): CSV file the rows are streamed to; also the checkpoint for resume.
+            A .npy or .parquet path gets a <out>.partial.csv checkpoint and is written at the end.
+        seed (int): sweep seed, each point's seed is derived from it and the point's parameters
+        mode (str): "simulate" for Monte Carlo, "estimate" for the protocols' closed-form estimates
+        max_workers (int): process pool size, os.cpu_count() by default
+        resume (bool): skip points already present in the checkpoint
+    """
+    points = expand_grid(grid)
+    for point in points:
+        if point["protocol"] not in protocols:
+            raise ValueError(f"Unsupported protocol: {point['protocol']}")
+
+    checkpoint = out if out is None or out.endswith(".csv") else out + ".partial.csv"
+    columns = list(grid) + RESULT_COLUMNS
+    done = read_checkpoint(checkpoint, columns) if resume else {}
+
+    jobs = []
+    for point in points:
+        params = point_params(point)
+        key = config_key({**params, "seed": seed, "mode": mode})
+        jobs.append((point, params, link_seed(seed, key), key))
+
+    rows = dict(done)
+    pending = [job for job in jobs if job[3] not in done]
+
+    f = None
+    if checkpoint:
+        new_file = not done
+        f = open(checkpoint, "w" if new_file else "a", newline="")
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+        if new_file:
+            writer.writeheader()
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(run_point, point, params, point_seed, mode): (point_seed, key)
+                       for point, params, point_seed, key in pending}
+            for future in as_completed(futures):
+                point_seed, key = futures[future]
+                row = {**future.result(), "seed": point_seed, "key": key}
+                rows[key] = row
+                if f:
+                    writer.writerow(row)
+                    f.flush()
+                print(f"[sweep] {len(rows)}/{len(jobs)} {future.result()}", file=sys.stderr)
+    finally:
+        if f:
+            f.close()
+
+    ordered = [rows[key] for *_, key in jobs]
+    if out and out != checkpoint:
+        save_table(ordered, out, columns)
+    return ordered
+
+
+def save_table(rows, path, columns):
+    """Writes rows as .csv, .npy (structured array) or .parquet (needs pandas)."""
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=columns, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(rows)
+    elif path.endswith(".npy"):
+        table = {c: np.array([_number(r.get(c)) for r in rows]) for c in columns}
+        dtype = [(c, a.dtype if a.dtype.kind in "fiub" else f"U{max(1, max(len(str(x)) for x in a))}") for c, a in table.items()]
+        np.save(path, np.array(list(zip(*table.values())), dtype=dtype))
+    elif path.endswith(".parquet"):
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("Parquet output needs pandas (and pyarrow): pip install pandas pyarrow")
+        pd.DataFrame(rows, columns=columns).to_parquet(path)
+    else:
+        raise ValueError(f"Unknown output format: {path}")
+
+
+def _number(value):
+    # CSV round-trips everything as text; numbers come back as int / float
+    if value is None:
+        return np.nan
+    if not isinstance(value, str):
+        return value
+    for kind in (int, float):
+        try:
+            return kind(value)
+        except (TypeError, ValueError):
+            pass
+    return str(value)
+
+
+def parse_values(text):
+    """'a,b,c' -> list of values, 'start:stop:num' -> np.linspace(start, stop, num)."""
+    if text.count(":") == 2:
+        start, stop, num = text.split(":")
+        return list(np.linspace(float(start), float(stop), int(num)))
+    return [_number(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep protocols over distances and channel/protocol parameters.")
+    parser.add_argument("--protocol", nargs="+", required=True, choices=sorted(protocols))
+    parser.add_argument("--distance", default="1000", help="metres: 'a,b,c' or 'start:stop:num'")
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUES",
+                        help="extra grid axis, e.g. depol_prob=0,0.1 or attenuation_db_per_m=0.0002:0.0004:3")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=["simulate", "estimate"], default="simulate")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--out", default="sweep.csv", help=".csv, .npy or .parquet")
+    parser.add_argument("--no-resume", action="store_true", help="start over instead of skipping finished points")
+    args = parser.parse_args(argv)
+
+    grid = {"protocol": args.protocol, "distance": parse_values(args.distance)}
+    for spec in args.param:
+        name, _, values = spec.partition("=")
+        grid[name] = parse_values(values)
+
+    rows = run_sweep(grid, out=args.out, seed=args.seed, mode=args.mode,
+                     max_workers=args.workers, resume=not args.no_resume)
+    print(f"{len(rows)} points written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,9 @@ for _ in range(num_trials):
     alice.pair_id = pair_id
     bob.pair_id = pair_id
 
+    # Both nodes hold the same state object (checked below); measuring consumes the pair
+    state_ids = (id(alice.components[pair_id]), id(bob.components[pair_id]))
+
     # 3. Alice and Bob measure
     a_outcome = alice.measure_entangled_qubit(basis='Z')
     b_outcome = bob.measure_entangled_qubit(basis='Z')
@@ -56,5 +59,6 @@ print(f"\nCorrelation: {correlated / num_trials:.2%} expected ~100% for Φ⁺ st
 
 print("\nExample Bell state amplitudes (last round):")
 print(np.round(bell_state, 3))
-print("Alice state id:", id(alice.components[pair_id]))
-print("Bob state id:", id(bob.components[pair_id]))
+print("Alice state id:", state_ids[0])
+print("Bob state id:", state_ids[1])
+print("Pairs still held by the manager:", len(manager.entangled_pairs))
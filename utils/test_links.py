@@ -0,0 +1,24 @@
+import sys
+import os
+
+# Ensure parent directory is in path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import link_params, simulate_link
+
+# Served path: the same params and worker function /simulate uses for a link
+print("=== Test 1: 10 km links sift a key ===")
+for protocol in ("DPS", "BB84"):
+    result = simulate_link("Alice", "Bob", link_params(10_000, protocol), seed=1)
+    print(f"{protocol}: key_rate {result['key_rate']:.3e}, pulses {result['hardware_stats']['num_pulses']}, nodes {result['nodes']}")
+    assert result["key_rate"] > 0
+    assert result["nodes"]["Bob"]["last_recv_time"] is not None
+
+# Almost nothing survives these channels (p = 1e-20 and 1e-40)
+for km in (1000, 2000):
+    print(f"\n=== Test: {km} km, key rate near 0 ===")
+    for protocol in ("DPS", "BB84"):
+        result = simulate_link("Alice", "Bob", link_params(km * 1000, protocol), seed=1)
+        print(f"{protocol}: Expected: 0.0, Got: {result['key_rate']}")
+        assert result["key_rate"] == 0.0
+        assert result["nodes"]["Bob"]["last_recv_time"] is None